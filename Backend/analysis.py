@@ -0,0 +1,769 @@
+"""
+Seat-demand analysis: file reading, schema detection, feature matrix,
+LightGBM training and the in-memory / streaming analyzers. Kept free of
+Flask so job and batch worker processes can import it without the app.
+"""
+import pandas as pd, numpy as np, random, os, re, hashlib
+from datetime import datetime, timezone
+from sklearn.model_selection import train_test_split
+import lightgbm as lgb
+
+from cache import TTLCache
+from dataset_cache import load_kaggle_frame
+import result_cache, model_registry, ingest, incremental, metrics, training_budget
+
+# Uploads above this size go through the streaming analyzer
+STREAM_THRESHOLD_BYTES = int(os.environ.get("STREAM_THRESHOLD_BYTES", 50 * 1024 * 1024))
+STREAM_TRAIN_ROWS = int(os.environ.get("STREAM_TRAIN_ROWS", 250_000))
+
+PREFERRED_TARGET = "num_passengers"
+# Fixed seed for deterministic (cacheable) analyses
+ANALYSIS_SEED = int(os.environ.get("ANALYSIS_SEED", 42))
+
+# ============================================================
+# 🧩 Read any file type
+# ============================================================
+@metrics.timed("read_file")
+def read_any_file(file):
+    """
+    Reads CSV/XLSX robustly, tries utf-8 then latin-1 for CSV.
+    """
+    try:
+        fname = (file.filename or "").lower()
+        if fname.endswith(".csv"):
+            try:
+                return pd.read_csv(file, encoding="utf-8")
+            except UnicodeDecodeError:
+                file.seek(0)
+                return pd.read_csv(file, encoding="latin1")
+        elif fname.endswith((".xlsx", ".xls")):
+            return pd.read_excel(file)
+        else:
+            # Try CSV as a last resort even if extension is odd
+            try:
+                file.seek(0)
+                return pd.read_csv(file, encoding="utf-8")
+            except Exception:
+                file.seek(0)
+                return pd.read_excel(file)
+    except Exception as e:
+        print("⚠️ File read error:", e)
+        return pd.DataFrame()
+
+
+# ============================================================
+# 🧩 Region/Festival Logic
+# ============================================================
+def detect_festivals(df):
+    df["is_festival"] = 0
+    if "route" in df.columns:
+        routes = df["route"].astype(str).str.upper()
+        india_routes = routes.str.contains("DEL|BLR|HYD|BOM|MAA|CCU")
+        uk_routes = routes.str.contains("LHR|LGW|MAN|EDI|LON")
+        us_routes = routes.str.contains("JFK|ORD|LAX|SFO|ATL")
+
+        df.loc[india_routes & df["month"].isin([10, 11]), "is_festival"] = 1
+        df.loc[uk_routes & df["month"].isin([12]), "is_festival"] = 1
+        df.loc[us_routes & df["month"].isin([11]), "is_festival"] = 1
+    else:
+        df["is_festival"] = df["month"].isin([11, 12]).astype(int)
+    return df
+
+# ====== Smart column detection & feature building ======
+
+# Common synonyms for target columns (lowercased)
+_TARGET_HINTS = ["num_passengers","passenger_count","pax","seats","seat","bookings","booking_count","tickets","sold","demand","load","price","fare","revenue"]
+
+# Regexes that likely indicate a route / origin / destination column
+_ROUTE_CANDIDATE_PATTERNS = [
+    re.compile(r"\broute\b"),
+    re.compile(r"\borigin\b|\bfrom\b|\bdep(?:arture)?_?(?:airport|city|iata)?\b"),
+    re.compile(r"\bdestination\b|\bto\b|\barr(?:ival)?_?(?:airport|city|iata)?\b"),
+    re.compile(r"\bfrom_?[a-z]*\b|\bto_?[a-z]*\b"),
+]
+
+def _normalize_cols(df):
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+
+# Schema detection runs on an evenly spaced row sample, never full columns
+SCHEMA_SAMPLE_ROWS = int(os.environ.get("SCHEMA_SAMPLE_ROWS", 2000))
+# header signature -> detected schema, so repeat layouts skip detection
+SCHEMA_CACHE = TTLCache(ttl=24 * 3600, maxsize=256, name="schema")
+_DATE_HINTS = ("date","journey","booking","travel","flight","dep","arr")
+
+def _schema_sample(df, n=None):
+    n = n or SCHEMA_SAMPLE_ROWS
+    if len(df) <= n:
+        return df
+    return df.iloc[np.linspace(0, len(df) - 1, n).astype(int)]
+
+def _detect_date_col(df: pd.DataFrame, sample=None):
+    s = _schema_sample(df) if sample is None else sample
+    need = max(3, len(s)//200)
+    tried = set()
+    # 1) name-based
+    for c in s.columns:
+        if any(k in c for k in _DATE_HINTS):
+            tried.add(c)
+            parsed = pd.to_datetime(s[c], errors="coerce", utc=True)
+            if parsed.notna().sum() > need:
+                return c
+    # 2) value-based (regex-ish via to_datetime)
+    for c in s.columns:
+        if c in tried:
+            continue
+        try:
+            parsed = pd.to_datetime(s[c], errors="coerce", utc=True)
+            if parsed.notna().sum() > need:
+                return c
+        except Exception:
+            pass
+    return None
+
+def _ensure_datetime(df, date_col, date_fmt=None):
+    """Single full-column parse, using the format inferred on the sample if any."""
+    if date_col is None:
+        # synthesize a timeline so model can still learn seasonality-ish signals
+        print("ℹ️ No date column found — synthesizing a timeline.")
+        df["__synthetic_date__"] = pd.date_range(datetime(2024,1,1,tzinfo=timezone.utc), periods=len(df))
+        return "__synthetic_date__"
+    parsed = pd.to_datetime(df[date_col], errors="coerce", utc=True, format=date_fmt)
+    if date_fmt and parsed.notna().mean() < 0.5:
+        # sample format didn't generalize; let pandas infer
+        parsed = pd.to_datetime(df[date_col], errors="coerce", utc=True)
+    if parsed.notna().sum() == 0:
+        print(f"ℹ️ Date column '{date_col}' unparsable — synthesizing a timeline.")
+        df["__synthetic_date__"] = pd.date_range(datetime(2024,1,1,tzinfo=timezone.utc), periods=len(df))
+        return "__synthetic_date__"
+    df[date_col] = parsed
+    return date_col
+
+def _detect_target(df: pd.DataFrame, sample=None, casts=None):
+    """
+    Picks the target on a row sample. Columns that had to be cast to
+    numeric are converted in df and, if `casts` is a list, recorded there.
+    """
+    s = _schema_sample(df) if sample is None else sample
+    # prefer hinted names
+    for c in s.columns:
+        if any(h in c for h in _TARGET_HINTS):
+            # must be numeric-like
+            vals = pd.to_numeric(s[c], errors="coerce")
+            if vals.notna().sum() > 0:
+                return c
+    # else, pick the "richest" numeric column
+    num_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    if not num_cols:
+        # attempt cast (text columns only: a parsed date column would turn into epoch ints)
+        numericable = [c for c in s.columns
+                       if s[c].dtype == object and pd.to_numeric(s[c], errors="coerce").notna().sum() > 0]
+        for c in numericable:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        if casts is not None:
+            casts.extend(numericable)
+        num_cols = numericable
+        s = _schema_sample(df)
+    if not num_cols:
+        return None
+    # choose the one with highest variance (likely signal)
+    return max(num_cols, key=lambda c: s[c].astype(float).var(skipna=True))
+
+def _schema_signature(df):
+    return hashlib.sha1(repr([(c, df[c].dtype.kind) for c in df.columns]).encode()).hexdigest()
+
+def _detect_schema(df):
+    """
+    Detects (and converts) the date column and picks the target, reusing
+    the cached result for files with the same header/dtype signature.
+    Returns (date_col, target).
+    """
+    sig = _schema_signature(df)
+    schema = SCHEMA_CACHE.get(sig)
+    if schema is None:
+        sample = _schema_sample(df)
+        raw_date = _detect_date_col(df, sample)
+        date_fmt = None
+        if raw_date and df[raw_date].dtype == object:
+            date_fmt = ingest.guess_date_format(sample[raw_date])
+        date_col = _ensure_datetime(df, raw_date, date_fmt)
+        casts = []
+        target = _detect_target(df, casts=casts)
+        schema = {"raw_date": raw_date, "date_fmt": date_fmt, "target": target, "casts": casts}
+        SCHEMA_CACHE.set(sig, schema)
+        return date_col, target
+    date_col = _ensure_datetime(df, schema["raw_date"], schema["date_fmt"])
+    for c in schema["casts"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return date_col, schema["target"]
+
+def _find_route_like_columns(df: pd.DataFrame):
+    # returns list of route-ish columns
+    cands = []
+    for c in df.columns:
+        name = c
+        if any(p.search(name) for p in _ROUTE_CANDIDATE_PATTERNS):
+            cands.append(c)
+    # also include columns that *look* like IATA codes or "AAA-BBB"
+    for c in df.columns:
+        if c in cands:
+            continue
+        s = df[c].astype(str).str.upper()
+        if s.str.contains(r"^[A-Z]{3}\s*[-/>\s]\s*[A-Z]{3}$", regex=True).mean() > 0.2:
+            cands.append(c)
+    return cands[:3]  # cap
+
+MAX_TEXT_FEATURES = 6  # text columns kept as categoricals, to avoid blow-up
+MAX_CATEGORY_LEVELS = 50  # above this a text column is factorized to integer codes
+MAX_ROUTE_LEVELS = 5000   # route columns stay categorical (per-route forecasts need the levels)
+ID_LIKE_SHARE = 0.5       # text columns unique on more than this share of rows (refs, emails) are dropped
+
+def _compact_numeric(s):
+    """float64 -> float32, ints -> smallest int type, so LightGBM builds a float32 matrix."""
+    if s.dtype == "float64":
+        return s.astype("float32")
+    if pd.api.types.is_integer_dtype(s.dtype) and s.dtype.itemsize > 2:
+        return pd.to_numeric(s, downcast="integer")
+    return s
+
+def _is_constant(s):
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.nunique() <= 1
+    lo, hi = s.min(), s.max()
+    return pd.isna(lo) or lo == hi
+
+def _build_feature_matrix(df: pd.DataFrame, target: str, date_col: str):
+    """
+    Builds X, y and returns meta without copying df:
+    - time features derived straight from the date column (int8/int16)
+    - numeric columns (except target) in compact dtypes
+    - up to MAX_TEXT_FEATURES text columns: pandas `category` (LightGBM
+      native categoricals) up to MAX_CATEGORY_LEVELS levels, integer codes
+      above that; identifier-like columns are skipped
+    - is_festival via your existing detect_festivals()
+    Only the final filter on rows with a missing target materializes X.
+    """
+    dates = df[date_col]
+    time_feats = {
+        "month": dates.dt.month.astype("int8"),
+        "day_of_week": dates.dt.dayofweek.astype("int8"),
+        "quarter": dates.dt.quarter.astype("int8"),
+        "year": dates.dt.year.astype("int16"),
+    }
+    time_feats["is_weekend"] = (time_feats["day_of_week"] >= 5).astype("int8")
+
+    # region/festival (on a two-column view, not a copy of df)
+    fest_src = {"month": time_feats["month"]}
+    if "route" in df.columns:
+        fest_src["route"] = df["route"]
+    time_feats["is_festival"] = detect_festivals(pd.DataFrame(fest_src, copy=False))["is_festival"].astype("int8")
+
+    # numeric features (all numeric except target), then time features
+    feats = {}
+    for c in df.columns:
+        dt_ = df[c].dtype
+        if c != target and pd.api.types.is_numeric_dtype(dt_) and not pd.api.types.is_bool_dtype(dt_):
+            feats[c] = _compact_numeric(df[c])
+    for c in ("month", "day_of_week", "is_weekend", "quarter", "year", "is_festival"):
+        feats[c] = time_feats[c]
+
+    # keep some raw text columns: low-cardinality ones as categoricals, the rest as codes
+    route_like = _find_route_like_columns(_schema_sample(df))
+    text_cols = 0
+    for c in df.columns:
+        if text_cols >= MAX_TEXT_FEATURES:
+            break
+        if c in feats or c == target or df[c].dtype != object:
+            continue
+        try:
+            codes, levels = pd.factorize(df[c], sort=True)
+        except TypeError:  # mixed, unorderable values
+            codes, levels = pd.factorize(df[c])
+        if len(levels) > ID_LIKE_SHARE * max(len(df), 1):
+            continue  # booking refs, emails, ...: nothing to learn, huge encodings
+        text_cols += 1
+        if len(levels) <= (MAX_ROUTE_LEVELS if c in route_like else MAX_CATEGORY_LEVELS):
+            feats[c] = pd.Series(pd.Categorical.from_codes(codes, levels), index=df.index)
+        else:
+            feats[c] = pd.Series(np.where(codes >= 0, codes, np.nan).astype("float32"), index=df.index)
+
+    X = pd.concat([v.rename(k) for k, v in feats.items()], axis=1, copy=False)
+    y = pd.to_numeric(df[target], errors="coerce")
+    keep = y.notna()
+    if not keep.all():
+        X, y = X[keep], y[keep]
+    y = y.astype(float)
+
+    # drop constant columns to avoid LightGBM "no split" warnings
+    const_cols = [c for c in X.columns if _is_constant(X[c])]
+    if const_cols:
+        X = X.drop(columns=const_cols)
+
+    cat_cols = [c for c in X.columns if isinstance(X[c].dtype, pd.CategoricalDtype)]
+    meta = {
+        "route_like_cols": route_like,
+        "rows": int(len(X)),
+        "feature_count": int(X.shape[1]),
+        "encodings": {"categorical": {c: [str(v) for v in X[c].cat.categories] for c in cat_cols}},
+    }
+    return X, y, meta
+
+
+def _base_values(X):
+    """Scenario baseline: median for numeric features, mode for categoricals."""
+    vals = {}
+    for c in X.columns:
+        s = X[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            vc = s.value_counts()
+            vals[c] = str(vc.index[0]) if len(vc) else None
+        else:
+            m = s.median()
+            vals[c] = 0.0 if pd.isna(m) else float(m)
+    return vals
+
+def _scenario_frame(n, cols, base, encodings, overrides):
+    """
+    n rows at the base values, with `overrides` {col: per-row values}.
+    Categorical columns are rebuilt against the training categories so
+    LightGBM maps them to the same codes.
+    """
+    cats = encodings.get("categorical", {})
+    data = {}
+    for c in cols:
+        v = overrides.get(c)
+        if c in cats:
+            data[c] = pd.Categorical(v if v is not None else [base.get(c)] * n, categories=cats[c])
+        elif v is not None:
+            data[c] = np.asarray(v, dtype="float64")
+        else:
+            data[c] = np.full(n, float(base.get(c) or 0.0))
+    return pd.DataFrame(data, columns=cols)
+
+def _route_override(names, route_col, cols, encodings):
+    """Per-row values that put each scenario row on route names[i]."""
+    cats = encodings.get("categorical", {}).get(route_col)
+    if cats is not None:
+        by_upper = {}
+        for v in cats:
+            by_upper.setdefault(v.upper(), v)  # match case-insensitively
+        return {route_col: [by_upper.get(n) for n in names]}
+    if route_col in cols:
+        return {route_col: pd.to_numeric(pd.Series(names), errors="coerce").to_numpy()}
+    return {}
+
+def _route_levels(route_col, encodings):
+    """Distinct (uppercased) route values known to a model's encodings."""
+    levels = encodings.get("categorical", {}).get(route_col) or []
+    return list(dict.fromkeys(str(v).upper() for v in levels))
+
+def _route_scenarios(X, route_values, route_col, encodings):
+    """
+    Scenario matrix with one row per distinct route: every feature at its
+    baseline, the route set to that route. Built from a single
+    value_counts over the column, no per-route copies.
+    Returns (route names, DataFrame aligned to X.columns).
+    """
+    names = route_values.astype(str).str.upper().value_counts().index.tolist()
+    cols = list(X.columns)
+    P = _scenario_frame(len(names), cols, _base_values(X), encodings,
+                        _route_override(names, route_col, cols, encodings))
+    return names, P
+
+def _per_route_forecast(model, X, route_values, route_col, encodings):
+    names, P = _route_scenarios(X, route_values, route_col, encodings)
+    if not names:
+        return {}
+    preds = model.predict(P)
+    return {name: float(round(val, 2)) for name, val in zip(names, preds)}
+
+
+# ============================================================
+# 🧩 Load Kaggle Dataset
+# ============================================================
+def load_airline_data():
+    try:
+        # columnar cache: parses the CSV once, memory-maps afterwards, works offline.
+        # The frame is shared and already tagged with its fingerprint (only real data is cacheable).
+        df = load_kaggle_frame()
+        if df.empty:
+            raise ValueError("Kaggle file empty")
+
+        print(f"✅ Loaded Kaggle dataset: {df.shape}")
+        return df
+
+    except Exception as e:
+        print("⚠️ Kaggle load error:", e)
+        # fallback to a small synthetic dataset so analysis never fails
+        return pd.DataFrame({
+            "booking_date": pd.date_range(datetime(2024,1,1,tzinfo=timezone.utc), periods=120),
+            "num_passengers": np.random.randint(50, 400, 120),
+            "route": np.random.choice(["DEL-BLR","BOM-DEL","HYD-MAA","BLR-CCU"], 120),
+            "fare": np.random.uniform(2500, 12000, 120).round(2)
+        })
+
+
+# ============================================================
+# 🧩 Model training (full fit or warm-start continuation)
+# ============================================================
+def _lgbm(seed, extra, n_estimators=200):
+    return lgb.LGBMRegressor(
+        n_estimators=n_estimators,
+        learning_rate=0.08,
+        subsample=0.9,
+        min_data_in_leaf=10,
+        min_data_in_bin=5,
+        random_state=seed,
+        verbose=-1,
+        **extra
+    )
+
+
+def _budgeted_fit(X_fit, y_fit, X_test, y_test, seed, extra, strata_cols=(),
+                  n_estimators=training_budget.MAX_ROUNDS, init_model=None):
+    """
+    One LightGBM fit under the training budget (see training_budget.py):
+    early stopping on a validation slice carved from the fit rows (the
+    test split stays untouched for the reported accuracy), wall-clock
+    cap, shared thread budget. Fit sets above ROW_BUDGET rows are
+    subsampled stratified by strata_cols. Returns (booster, budget
+    report, subsample report|None).
+    """
+    make = lambda n, n_jobs: _lgbm(seed, {**extra, "n_jobs": n_jobs}, n_estimators=n)
+    split = training_budget.validation_split(len(X_fit), seed)
+    X_val = y_val = None
+    if split is not None:
+        fit_pos, val_pos = split
+        X_val, y_val = X_fit.iloc[val_pos], y_fit.iloc[val_pos]
+        X_fit, y_fit = X_fit.iloc[fit_pos], y_fit.iloc[fit_pos]
+    cols = [c for c in strata_cols if c in X_fit.columns]
+    pos = training_budget.stratified_positions(X_fit[cols], training_budget.ROW_BUDGET, seed)
+    if pos is None:
+        booster, budget = training_budget.fit(make, X_fit, y_fit, X_val, y_val, init_model, n_estimators)
+        budget["validation_rows"] = 0 if X_val is None else int(len(X_val))
+        return booster, budget, None
+
+    print(f"🎯 Training on a stratified {len(pos):,}/{len(X_fit):,} row sample ({', '.join(cols) or 'uniform'})")
+    X_s, y_s = X_fit.iloc[pos], y_fit.iloc[pos]
+    booster, budget = training_budget.fit(make, X_s, y_s, X_val, y_val, init_model, n_estimators)
+    budget["validation_rows"] = 0 if X_val is None else int(len(X_val))
+
+    def refit_half():
+        half = training_budget.stratified_positions(X_s[cols], len(pos) // 2, seed + 1)
+        b, _ = training_budget.fit(make, X_s.iloc[half], y_s.iloc[half], init_model=init_model,
+                            n_estimators=max(1, budget["rounds_kept"]), early_stopping=False)
+        return b, len(half)
+
+    cost = training_budget.subsample_cost(booster, refit_half if training_budget.MEASURE_SUBSAMPLE_COST else None,
+                                   X_test, y_test, len(pos), len(X_fit))
+    return booster, budget, {"rows_total": int(len(X_fit)), "rows_used": int(len(pos)),
+                             "strata_cols": cols, **cost}
+
+
+def _train_booster(X, y, train_idx, test_idx, target, seed, extra, encodings, incremental_on=True,
+                   strata_cols=()):
+    """
+    Fits the booster for one batch. With incremental_on, batches sharing a
+    feature schema form a lineage (see incremental.py):
+    - schema matches the current model, drift and unseen categories under
+      their thresholds -> continue training it on the new batch only
+    - otherwise -> full retrain on the rolling store + the new batch
+    Every fit goes through _budgeted_fit; strata_cols (route, month) drive
+    the row-budget sampling.
+    Returns (booster, X re-encoded to the booster's categories, encodings, info).
+    """
+    def held_out(frame):
+        return frame.loc[test_idx], y.loc[test_idx]
+
+    if not incremental_on:
+        booster, budget, sub = _budgeted_fit(X.loc[train_idx], y.loc[train_idx], *held_out(X),
+                                             seed, extra, strata_cols)
+        info = {"mode": "full", "budget": budget, "trees": booster.num_trees()}
+        if sub:
+            info["subsample"] = sub
+        return booster, X, encodings, info
+
+    family = incremental.family_key(model_registry.schema_signature(X), target)
+    lineage = incremental.get_lineage(family)
+    prev = model_registry.get_model(lineage["model_key"]) if lineage else None
+    raw_train = (X.loc[train_idx], y.loc[train_idx])
+    info = {"mode": "full", "drift": None, "unseen_categories": None}
+
+    if prev:
+        prev_booster, prev_meta = prev
+        prev_cats = prev_meta.get("encodings", {}).get("categorical", {})
+        X_al, unseen = incremental.align_categories(X, prev_cats)
+        drift = incremental.drift_score(prev_booster, X_al, y, lineage.get("ref_rmse"))
+        info.update(drift=round(drift, 4), unseen_categories=round(unseen, 4))
+        if (drift <= incremental.DRIFT_THRESHOLD and unseen <= incremental.UNSEEN_THRESHOLD
+                and prev_booster.num_trees() + incremental.INCREMENTAL_ROUNDS <= incremental.MAX_TREES):
+            booster, budget, sub = _budgeted_fit(
+                X_al.loc[train_idx], y.loc[train_idx], *held_out(X_al), seed, extra, strata_cols,
+                n_estimators=incremental.INCREMENTAL_ROUNDS, init_model=prev_booster,
+            )
+            X, encodings = X_al, {"categorical": prev_cats}
+            info["mode"] = "incremental"
+        else:
+            print(f"🔁 Full retrain for lineage {family} (drift={drift:.3f}, unseen={unseen:.3f})")
+
+    if info["mode"] == "full":
+        # the batch joins the store first; append_batch skips content it already
+        # holds, so re-analyzing the same data doesn't count its rows twice
+        incremental.append_batch(family, *raw_train)
+        X_fit, y_fit = incremental.load_store(family, X.columns)
+        if X_fit is not None:
+            cats = {c: [str(v) for v in X_fit[c].cat.categories]
+                    for c in X_fit.columns if isinstance(X_fit[c].dtype, pd.CategoricalDtype)}
+            X = incremental.align_categories(X, cats)[0]
+            encodings = {"categorical": cats}
+        else:
+            X_fit, y_fit = raw_train
+        booster, budget, sub = _budgeted_fit(X_fit, y_fit, *held_out(X), seed, extra, strata_cols)
+        info["train_rows"] = int(len(X_fit))
+    else:
+        info["train_rows"] = int(len(train_idx))
+        incremental.append_batch(family, *raw_train)
+
+    info["budget"] = budget
+    if sub:
+        info["subsample"] = sub
+    info["trees"] = booster.num_trees()
+    info["lineage"] = family
+    info["ref_rmse"] = incremental.rmse(booster, X.loc[test_idx], y.loc[test_idx])
+    return booster, X, encodings, info
+
+
+# ============================================================
+# 🧩 Analyze Seat Demand
+# ============================================================
+def analyze_seat_demand(df, deterministic=True, dataset_id=None):
+    """
+    Truly schema-agnostic seat-demand analysis:
+    - detects date or synthesizes it
+    - detects/chooses numeric target
+    - builds rich feature matrix (time + numeric + bounded categoricals)
+    - trains LightGBM robustly
+    - returns overall prediction + spread + trends + per-route forecast (if possible)
+    deterministic=True pins the split/model seeds to ANALYSIS_SEED so the
+    same input always yields the same result (required for result caching).
+    With a dataset_id (content hash / fingerprint) deterministic runs reuse
+    the trained booster from model_registry instead of refitting.
+    """
+    if df is None or df.empty:
+        return {"error": "Dataset is empty"}
+
+    with metrics.stage("normalize_cols"):
+        # below, columns are only renamed, added or replaced whole, never written in
+        # place, so a shallow copy keeps the caller's (possibly shared) frame intact
+        df = _normalize_cols(df.copy(deep=False))
+
+    with metrics.stage("detect_schema"):
+        date_col, target = _detect_schema(df)
+    if not target:
+        return {"error": "No numeric column found to analyze as demand/target"}
+
+    # Build features
+    with metrics.stage("build_feature_matrix"):
+        X, y, meta = _build_feature_matrix(df, target, date_col)
+    if len(X) < 5 or X.shape[1] == 0:
+        # too small; return descriptive stats
+        avg_val = float(np.nanmean(y)) if len(y) else 0.0
+        monthly_avg = df.assign(__m__=df[date_col].dt.month).groupby("__m__")[target].mean().round(2).to_dict()
+        weekday_avg = df.assign(__w__=df[date_col].dt.dayofweek).groupby("__w__")[target].mean().round(2).to_dict()
+        return {
+            "predicted_demand": round(avg_val, 2),
+            "variation_std": 0.0,
+            "range": {"min": round(float(np.nanmin(y)),2) if len(y) else 0.0, "max": round(float(np.nanmax(y)),2) if len(y) else 0.0},
+            "monthly_trends": monthly_avg,
+            "weekday_trends": weekday_avg,
+            "festive_avg": float(df.loc[df.get("is_festival",0)==1, target].mean() if "is_festival" in df else 0.0),
+            "chart_data": [{"month": int(m), "value": float(v)} for m, v in sorted(monthly_avg.items())],
+            "message": f"Small/featureless dataset — returned descriptive stats for '{target}' ✅"
+        }
+
+    # Train model (reuse a registered one for this dataset + schema, else
+    # continue the current model for this feature schema when possible)
+    seed = ANALYSIS_SEED if deterministic else random.randint(1, 9999)
+    extra = {"deterministic": True, "force_row_wise": True} if deterministic else {}
+    reg_key = model_registry.model_key(dataset_id, X, seed=seed) if (deterministic and dataset_id) else None
+    encodings = meta.get("encodings", {})
+    training = {"mode": "cached"}
+    try:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size=min(0.2, max(0.1, 1.0/len(X))), random_state=seed
+        )
+        cached = model_registry.get_model(reg_key) if reg_key else None
+        if cached:
+            model = cached[0]
+            encodings = cached[1].get("encodings", encodings)
+            training = {**cached[1].get("training", {}), "mode": "cached"}
+        else:
+            with metrics.stage("training"):
+                model, X, encodings, training = _train_booster(
+                    X, y, X_train.index, X_test.index, target, seed, extra, encodings,
+                    incremental_on=bool(reg_key) and incremental.ENABLED,
+                    strata_cols=[c for c in ((meta.get("route_like_cols") or [None])[0], "month") if c],
+                )
+            X_test = X.loc[X_test.index]
+            if reg_key:
+                model_registry.save_model(reg_key, model, {
+                    "dataset_id": dataset_id,
+                    "target": target,
+                    "date_col": date_col,
+                    "features": list(X.columns),
+                    "base_values": _base_values(X),
+                    "encodings": encodings,
+                    "route_like_cols": meta.get("route_like_cols", []),
+                    "rows": meta.get("rows", 0),
+                    "training": training,
+                })
+                if training.get("lineage"):
+                    incremental.set_lineage(training["lineage"], model_key=reg_key,
+                                            ref_rmse=training["ref_rmse"], trees=training["trees"])
+        with metrics.stage("predict"):
+            preds = model.predict(X_test)
+        avg_pred = float(np.mean(preds))
+        std_pred = float(np.std(preds))
+        rmin, rmax = float(np.min(preds)), float(np.max(preds))
+    except Exception as e:
+        print("⚠️ Model fallback:", e)
+        avg_pred, std_pred = float(y.mean()), float(y.std())
+        rmin, rmax = float(y.min()), float(y.max())
+
+    # Trends
+    with metrics.stage("trends"):
+        monthly_avg = df.assign(__m__=df[date_col].dt.month).groupby("__m__")[target].mean().round(2).to_dict()
+        weekday_avg = df.assign(__w__=df[date_col].dt.dayofweek).groupby("__w__")[target].mean().round(2).to_dict()
+        festive_avg = float(df.loc[df.get("is_festival",0)==1, target].mean() if "is_festival" in df else 0.0)
+
+    # Per-route forecast (if we can) — every distinct route, one predict call
+    per_route = {}
+    route_cols = meta.get("route_like_cols") or []
+    chosen_route_col = route_cols[0] if route_cols else None
+
+    if chosen_route_col:
+        try:
+            with metrics.stage("per_route_forecast"):
+                per_route = _per_route_forecast(model, X, df[chosen_route_col], chosen_route_col, encodings)
+        except Exception as e:
+            print("⚠️ Per-route predict failed:", e)
+
+    return {
+    "predicted_demand": round(avg_pred, 2),
+    "variation_std": round(std_pred, 2),
+    "range": {"min": round(rmin, 2), "max": round(rmax, 2)},
+    "monthly_trends": {int(k): float(v) for k, v in monthly_avg.items()},
+    "weekday_trends": {int(k): float(v) for k, v in weekday_avg.items()},
+    "records_analyzed": meta.get("rows", 0),  # ✅ Added
+    "target_column": target,                  # ✅ Added
+    "per_route_forecast": dict(sorted(per_route.items(), key=lambda kv: kv[1], reverse=True)),
+    "chart_data": [{"month": int(m), "value": float(v)} for m, v in sorted(monthly_avg.items())],
+    "training": training,
+    "model_key": reg_key,
+    "message": f"Seat demand analysis complete ✅ (target='{target}', rows={meta['rows']}, features={meta['feature_count']})"
+}
+
+
+
+# ============================================================
+# 🌊 Streaming (out-of-core) analysis for very large CSVs
+# ============================================================
+def analyze_seat_demand_streaming(path, deterministic=True, dataset_id=None,
+                                  chunksize=ingest.DEFAULT_CHUNKSIZE, train_rows=None):
+    """
+    Same output as analyze_seat_demand, but for CSVs larger than memory:
+    - schema (date col, target, dtypes) is detected on a bounded head sample
+    - monthly/weekday/festive averages are accumulated chunk by chunk
+    - the model trains on a uniform reservoir sample of `train_rows` rows
+    Peak memory is ~chunksize + train_rows rows regardless of file size.
+    """
+    train_rows = train_rows or STREAM_TRAIN_ROWS
+    sample, encoding = ingest.read_sample(path)
+    if sample.empty:
+        return {"error": "Dataset is empty"}
+    raw_cols = list(sample.columns)
+    dtypes = ingest.infer_dtypes(sample)
+    sample = _normalize_cols(sample)
+    with metrics.stage("detect_schema"):
+        date_col = _detect_date_col(sample, _schema_sample(sample))
+        target = _detect_target(sample.copy())
+    if not target:
+        return {"error": "No numeric column found to analyze as demand/target"}
+    date_fmt = ingest.guess_date_format(sample[date_col]) if date_col else None
+    del sample
+
+    monthly, weekday, festive = ingest.RunningMean(), ingest.RunningMean(), ingest.RunningMean()
+    reservoir = ingest.Reservoir(train_rows, seed=ANALYSIS_SEED if deterministic else None)
+    synth_start = pd.Timestamp(datetime(2024, 1, 1, tzinfo=timezone.utc))
+    offset = 0
+    for chunk in ingest.iter_csv_chunks(path, chunksize=chunksize, dtype=dtypes, encoding=encoding):
+        with metrics.stage("aggregate_chunk"):
+            chunk = _normalize_cols(chunk)
+            if date_col:
+                parsed = pd.to_datetime(chunk[date_col], errors="coerce", utc=True, format=date_fmt)
+                if date_fmt and parsed.isna().mean() > 0.5:
+                    # head sample was ambiguous (e.g. dd/mm vs mm/dd); re-guess on this chunk
+                    date_fmt = ingest.guess_date_format(chunk[date_col])
+                    parsed = pd.to_datetime(chunk[date_col], errors="coerce", utc=True, format=date_fmt)
+                chunk[date_col] = parsed
+                chunk = chunk[parsed.notna()]
+                dcol = date_col
+            else:
+                # same synthetic daily timeline _ensure_datetime would build, continued across chunks
+                chunk["__synthetic_date__"] = synth_start + pd.to_timedelta(np.arange(offset, offset + len(chunk)), unit="D")
+                dcol = "__synthetic_date__"
+            offset += len(chunk)
+            chunk[target] = pd.to_numeric(chunk[target], errors="coerce")
+            chunk["month"] = chunk[dcol].dt.month
+            chunk = detect_festivals(chunk)
+            monthly.update(chunk["month"], chunk[target])
+            weekday.update(chunk[dcol].dt.dayofweek, chunk[target])
+            festive.update(chunk["is_festival"], chunk[target])
+            reservoir.add(chunk.drop(columns=["month", "is_festival"]))
+
+    result = analyze_seat_demand(reservoir.sample(), deterministic=deterministic, dataset_id=dataset_id)
+    if "error" in result:
+        return result
+    monthly_avg = {int(k): float(v) for k, v in monthly.means().items() if pd.notna(k)}
+    weekday_avg = {int(k): float(v) for k, v in weekday.means().items() if pd.notna(k)}
+    result.update({
+        "monthly_trends": monthly_avg,
+        "weekday_trends": weekday_avg,
+        "festive_avg": float(festive.means().get(1, 0.0)),
+        "chart_data": [{"month": m, "value": v} for m, v in sorted(monthly_avg.items())],
+        "records_analyzed": int(reservoir.seen),
+        "trained_on_rows": int(min(reservoir.seen, train_rows)),
+        "source_columns": raw_cols,
+        "streamed": True,
+    })
+    return result
+
+
+# ============================================================
+# ⚡ Result cache in front of the analyzers
+# ============================================================
+def analyze_cached(df_or_loader, content_hash, deterministic=True, analyzer=None, **analyzer_kwargs):
+    """
+    Runs analyze_seat_demand (or `analyzer`, e.g. the streaming variant)
+    through the content-addressed result cache. df_or_loader may be the
+    analyzer's input or a zero-arg callable producing it, so cache hits
+    skip parsing entirely. analyzer_kwargs are passed through and are not
+    part of the cache key. Returns (result, cache_hit).
+    """
+    analyzer = analyzer or analyze_seat_demand
+    key = None
+    if deterministic and content_hash:
+        params = {"deterministic": True, "seed": ANALYSIS_SEED}
+        if analyzer is not analyze_seat_demand:
+            params["analyzer"] = analyzer.__name__
+        key = result_cache.cache_key(content_hash, **params)
+        with metrics.stage("result_cache_lookup"):
+            hit = result_cache.get_cached_result(key)
+        if hit is not None:
+            return hit, True
+    data = df_or_loader() if callable(df_or_loader) else df_or_loader
+    result = analyzer(data, deterministic=deterministic, dataset_id=content_hash, **analyzer_kwargs)
+    if key and "error" not in result:
+        result_cache.put_cached_result(key, result)
+    return result, False
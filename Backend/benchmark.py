@@ -0,0 +1,267 @@
+"""
+Seat-demand pipeline benchmark.
+
+Generates deterministic synthetic booking CSVs and times every stage of the
+upload analysis (read_any_file -> _normalize_cols -> date detection ->
+target detection -> _build_feature_matrix -> training -> per-route forecast),
+recording the process peak RSS after each stage. Each case runs in a fresh
+process so peaks don't leak between cases.
+
+    python benchmark.py                          # 10k + 1M rows, all profiles
+    python benchmark.py --sizes 10k,1m,10m --profiles baseline
+    python benchmark.py --save                   # overwrite bench_baseline.json
+    python benchmark.py --compare                # diff against bench_baseline.json
+"""
+import os, sys, json, time, argparse, platform, resource
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "bench_baseline.json")
+DATA_DIR = os.environ.get("BENCH_DATA_DIR", os.path.join(HERE, ".cache", "bench"))
+GEN_CHUNK = 1_000_000
+
+# profile -> generator knobs
+PROFILES = {
+    "baseline":         {"routes": 200,  "date_format": "%Y-%m-%d %H:%M:%S", "extra_text": 0},
+    "high_cardinality": {"routes": 5000, "date_format": "%Y-%m-%d %H:%M:%S", "extra_text": 0},
+    "dayfirst_dates":   {"routes": 200,  "date_format": "%d/%m/%Y %H:%M",    "extra_text": 0},
+    "wide_text":        {"routes": 200,  "date_format": "%d %b %Y",          "extra_text": 6},
+}
+STAGES = ("read_any_file", "normalize_cols", "detect_date_col", "detect_target",
+          "build_feature_matrix", "training", "per_route_forecast")
+
+
+# ============================================================
+# 🧪 Deterministic synthetic booking data
+# ============================================================
+def _airports(n):
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    idx = np.arange(n)
+    return letters[idx % 26] + letters[(idx // 26) % 26] + letters[(idx // 676) % 26]
+
+
+def _route_names(n, rng):
+    ap = _airports(max(8, int(np.ceil(np.sqrt(n))) + 1))
+    pairs = set()
+    while len(pairs) < n:
+        o, d = rng.integers(0, len(ap), 2)
+        if o != d:
+            pairs.add(f"{ap[o]}-{ap[d]}")
+    return np.array(sorted(pairs))
+
+
+def make_bookings(rows, routes=200, date_format="%Y-%m-%d %H:%M:%S", extra_text=0, seed=42):
+    """
+    Booking frame with a learnable demand signal (route, month, weekday,
+    lead time). Same arguments -> identical frame.
+    """
+    rng = np.random.default_rng(seed)
+    route_names = _route_names(routes, np.random.default_rng(seed + 1))
+    route_base = np.random.default_rng(seed + 2).uniform(80, 320, routes)
+
+    # format each distinct hour once, then index into the table
+    hours = pd.date_range("2023-01-01", "2024-12-31 23:00", freq="h")
+    hour_idx = rng.integers(0, len(hours), rows)
+    when = hours[hour_idx]
+    date_strings = np.asarray(hours.strftime(date_format), dtype=object)[hour_idx]
+
+    r = rng.integers(0, routes, rows)
+    lead = rng.integers(0, 365, rows)
+    season = 1 + 0.25 * np.sin(2 * np.pi * (when.month.to_numpy() - 1) / 12)
+    weekend = np.where(when.dayofweek.to_numpy() >= 5, 1.15, 1.0)
+    demand = route_base[r] * season * weekend * (1 - lead / 1460) + rng.normal(0, 12, rows)
+
+    data = {
+        "Booking Date": date_strings,
+        "Route": route_names[r],
+        "Num Passengers": np.clip(demand, 1, None).round().astype(np.int32),
+        "Fare": (rng.uniform(2500, 12000, rows)).round(2),
+        "Purchase Lead": lead,
+        "Flight Hour": when.hour.to_numpy(),
+        "Sales Channel": np.where(rng.random(rows) < 0.7, "Internet", "Mobile"),
+    }
+    for i in range(extra_text):
+        data[f"Note {i}"] = np.char.add(f"tag{i}_", rng.integers(0, 50 * (i + 1), rows).astype(str))
+    return pd.DataFrame(data)
+
+
+def dataset_path(profile, rows, seed=42):
+    """Generates (once) and returns the CSV for profile x rows, in 1M-row chunks."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{profile}-{rows}-{seed}.csv")
+    if os.path.exists(path):
+        return path
+    knobs = PROFILES[profile]
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as fh:
+        for i, start in enumerate(range(0, rows, GEN_CHUNK)):
+            n = min(GEN_CHUNK, rows - start)
+            make_bookings(n, seed=seed + 1000 * i, **knobs).to_csv(fh, index=False, header=(i == 0))
+    os.replace(tmp, path)
+    return path
+
+
+# ============================================================
+# ⏱️ Stage timing (runs inside a fresh process per case)
+# ============================================================
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_case(path, seed, out):
+    sys.path.insert(0, HERE)
+    from werkzeug.datastructures import FileStorage
+    from sklearn.model_selection import train_test_split
+    import analysis, ingest
+
+    stages = {}
+    mark = {"t": time.perf_counter()}
+
+    def done(name):
+        now = time.perf_counter()
+        stages[name] = {"seconds": round(now - mark["t"], 4), "peak_rss_mb": _peak_rss_mb()}
+        mark["t"] = now
+
+    startup_rss = _peak_rss_mb()
+    mark["t"] = time.perf_counter()
+    with open(path, "rb") as fh:
+        df = analysis.read_any_file(FileStorage(stream=fh, filename=os.path.basename(path)))
+    done("read_any_file")
+
+    df = analysis._normalize_cols(df)
+    done("normalize_cols")
+
+    # uncached equivalent of analysis._detect_schema, split into its two stages
+    sample = analysis._schema_sample(df)
+    raw_date = analysis._detect_date_col(df, sample)
+    date_fmt = ingest.guess_date_format(sample[raw_date]) if raw_date and df[raw_date].dtype == object else None
+    date_col = analysis._ensure_datetime(df, raw_date, date_fmt)
+    done("detect_date_col")
+
+    target = analysis._detect_target(df)
+    done("detect_target")
+
+    X, y, meta = analysis._build_feature_matrix(df, target, date_col)
+    done("build_feature_matrix")
+
+    X_train, X_test, _, _ = train_test_split(X, y, test_size=0.2, random_state=seed)
+    extra = {"deterministic": True, "force_row_wise": True}
+    route_cols = meta.get("route_like_cols") or []
+    model, X, encodings, _ = analysis._train_booster(
+        X, y, X_train.index, X_test.index, target, seed, extra, meta.get("encodings", {}), incremental_on=False,
+        strata_cols=route_cols[:1] + ["month"],
+    )
+    done("training")
+
+    per_route = {}
+    if route_cols:
+        per_route = analysis._per_route_forecast(model, X, df[route_cols[0]], route_cols[0], encodings)
+    done("per_route_forecast")
+
+    out.put({
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages.values()), 4),
+        "startup_rss_mb": startup_rss,
+        "peak_rss_mb": _peak_rss_mb(),
+        "detected": {"date_col": raw_date, "date_format": date_fmt, "target": target},
+        "features": int(X.shape[1]),
+        "routes_forecast": len(per_route),
+    })
+
+
+def run_case(profile, rows, seed=42):
+    path = dataset_path(profile, rows, seed)
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_run_case, args=(path, seed, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return {"profile": profile, "rows": rows, "file_mb": round(os.path.getsize(path) / 2**20, 1), **result}
+
+
+# ============================================================
+# 📊 Baseline file + regression diff
+# ============================================================
+def _parse_rows(token):
+    token = token.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(token[-1])
+    return int(float(token[:-1]) * mult) if mult else int(token)
+
+
+def environment():
+    import lightgbm, sklearn
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "lightgbm": lightgbm.__version__,
+        "sklearn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints per-stage ratios vs the baseline; returns the regressed (case, stage) list."""
+    base = {(r["profile"], r["rows"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["profile"], r["rows"]))
+        if not b:
+            print(f"  {r['profile']} x {r['rows']}: no baseline")
+            continue
+        for stage in STAGES:
+            new, old = r["stages"][stage]["seconds"], b["stages"][stage]["seconds"]
+            ratio = new / old if old else 1.0
+            flag = ""
+            if ratio > threshold and new - old > 0.05:
+                flag = "  ⚠️ regression"
+                regressions.append((r["profile"], r["rows"], stage))
+            print(f"  {r['profile']:>16} {r['rows']:>9} {stage:>20}: {old:8.3f}s -> {new:8.3f}s ({ratio:4.2f}x){flag}")
+        print(f"  {r['profile']:>16} {r['rows']:>9} {'peak_rss_mb':>20}: {b['peak_rss_mb']} -> {r['peak_rss_mb']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,1m", help="comma list of row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma list of " + ", ".join(PROFILES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--save", action="store_true", help=f"write results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--compare", action="store_true", help="diff against the baseline, exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in map(_parse_rows, args.sizes.split(",")):
+        for profile in args.profiles.split(","):
+            print(f"⏱️ {profile} x {rows:,} rows ...", flush=True)
+            r = run_case(profile, rows, args.seed)
+            print(f"   {r['total_seconds']:.2f}s, peak {r['peak_rss_mb']} MB, "
+                  + ", ".join(f"{k}={v['seconds']:.2f}s" for k, v in r["stages"].items()), flush=True)
+            results.append(r)
+
+    report = {"environment": environment(), "seed": args.seed, "results": results}
+    for path in filter(None, [args.out, BASELINE_PATH if args.save else None]):
+        with open(path, "w") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+        print(f"💾 Wrote {path}")
+
+    if args.compare:
+        with open(BASELINE_PATH) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} stage regression(s)")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
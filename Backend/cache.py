@@ -0,0 +1,72 @@
+import threading, time, weakref
+
+_MISSING = object()
+_INSTANCES = weakref.WeakSet()  # every live TTLCache, for metrics
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry.
+    Keeps hit/miss counters so callers can report cache efficiency.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=256, name="cache"):
+        self.ttl = float(ttl)
+        self.maxsize = int(maxsize)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = {}
+        self._lock = threading.Lock()
+        _INSTANCES.add(self)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[0] > now:
+                self.hits += 1
+                return item[1]
+            if item is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else float(ttl))
+        with self._lock:
+            if len(self._data) >= self.maxsize and key not in self._data:
+                # drop the entry closest to expiry
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (expires, value)
+        return value
+
+    def get_or_set(self, key, factory, ttl=None):
+        val = self.get(key, _MISSING)
+        if val is _MISSING:
+            val = self.set(key, factory(), ttl)
+        return val
+
+    def invalidate(self, key=None):
+        """Drops one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def all_stats():
+    """stats() of every live TTLCache, sorted by name."""
+    return sorted((c.stats() for c in list(_INSTANCES)), key=lambda st: st["name"])
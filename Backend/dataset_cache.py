@@ -0,0 +1,204 @@
+import os, json, threading, hashlib
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, writes stay atomic via os.replace
+    fcntl = None
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; fall back to pickle
+    feather = None
+
+KAGGLE_DATASET = "minnikeswarrao/british-airways-customer-booking"
+CACHE_DIR = os.environ.get(
+    "FLYDASH_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+_DATA_EXTS = (".csv", ".xlsx", ".xls")
+
+_MEM = {"fingerprint": None, "df": None}
+_LOCK = threading.Lock()
+
+
+# ============================================================
+# 🔎 Locate the source file without touching the network
+# ============================================================
+def _first_data_file(path):
+    for root, dirs, files in os.walk(path):
+        dirs.sort(reverse=True)  # newest kagglehub "versions/N" first
+        for f in sorted(files):
+            if f.lower().endswith(_DATA_EXTS):
+                return os.path.join(root, f)
+    return None
+
+
+def _local_source():
+    """Explicit KAGGLE_DATA_PATH, else kagglehub's on-disk cache."""
+    explicit = os.environ.get("KAGGLE_DATA_PATH")
+    if explicit and os.path.exists(explicit):
+        return explicit if os.path.isfile(explicit) else _first_data_file(explicit)
+    hub_root = os.environ.get("KAGGLEHUB_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "kagglehub"))
+    owner, slug = KAGGLE_DATASET.split("/")
+    hub_path = os.path.join(hub_root, "datasets", owner, slug)
+    if os.path.isdir(hub_path):
+        return _first_data_file(hub_path)
+    return None
+
+
+def _download_source():
+    import kagglehub
+    print("🔄 Downloading Kaggle dataset...")
+    return _first_data_file(kagglehub.dataset_download(KAGGLE_DATASET))
+
+
+def fingerprint(path):
+    """Cheap identity for a source file: path + size + mtime + head/tail hash."""
+    st = os.stat(path)
+    h = hashlib.sha1(f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}".encode())
+    with open(path, "rb") as fh:
+        h.update(fh.read(65536))
+        if st.st_size > 65536:
+            fh.seek(-65536, os.SEEK_END)
+            h.update(fh.read(65536))
+    return h.hexdigest()
+
+
+def read_source(path):
+    if path.lower().endswith(".csv"):
+        try:
+            return pd.read_csv(path, encoding="utf-8")
+        except UnicodeDecodeError:
+            return pd.read_csv(path, encoding="latin1")
+    return pd.read_excel(path)
+
+
+# ============================================================
+# 💾 Columnar cache on disk
+# ============================================================
+def _paths():
+    ext = ".feather" if feather is not None else ".pkl"
+    return os.path.join(CACHE_DIR, "kaggle" + ext), os.path.join(CACHE_DIR, "kaggle.manifest.json")
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextmanager
+def _build_lock():
+    """Exclusive cross-process lock around reading/(re)building the cache (job workers share it)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, "kaggle.lock"), "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _write_columnar(df, data_path, manifest_path, meta):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{data_path}.{os.getpid()}.tmp"
+    if feather is not None:
+        # uncompressed Feather v2 can be memory-mapped without a decode step
+        feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, data_path)
+    with open(f"{manifest_path}.{os.getpid()}.tmp", "w") as fh:
+        json.dump(meta, fh)
+    os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+
+
+def _read_columnar(data_path):
+    if feather is not None:
+        # split_blocks: numeric columns without nulls stay zero-copy (read-only)
+        # views of the map instead of being consolidated into fresh 2-D blocks;
+        # text columns still become Python objects once
+        return feather.read_table(data_path, memory_map=True).to_pandas(split_blocks=True)
+    return pd.read_pickle(data_path)
+
+
+def _load_or_build(source):
+    data_path, manifest_path = _paths()
+    fp = fingerprint(source) if source else _read_manifest(manifest_path).get("fingerprint")
+    if fp and _MEM["fingerprint"] == fp:
+        return _MEM["df"]
+
+    with _build_lock():
+        # read the manifest under the lock: another process may have just rebuilt it
+        manifest = _read_manifest(manifest_path)
+        fp = fp or manifest.get("fingerprint")
+        if os.path.exists(data_path) and manifest.get("fingerprint") == fp:
+            print(f"⚡ Loading Kaggle dataset from columnar cache ({os.path.basename(data_path)})")
+            df = _read_columnar(data_path)
+        elif source:
+            print(f"🛠️ Building columnar cache from {source}")
+            df = read_source(source)
+            if df.empty:
+                raise ValueError("Kaggle file empty")
+            _write_columnar(df, data_path, manifest_path, {"fingerprint": fp, "source": source, "shape": list(df.shape)})
+        else:
+            raise FileNotFoundError("No Kaggle source file and no columnar cache available")
+
+    df.attrs["fingerprint"] = fp
+    _MEM["fingerprint"], _MEM["df"] = fp, df
+    return df
+
+
+def _resolve_source():
+    """Local source file: explicit/kagglehub path, else the one the cache was built from."""
+    source = _local_source()
+    if source is None:
+        prev = _read_manifest(_paths()[1]).get("source")
+        if prev and os.path.exists(prev):
+            source = prev
+    return source
+
+
+def load_kaggle_frame(allow_download=True):
+    """
+    Returns the shared, read-only Kaggle frame, tagged with
+    attrs["fingerprint"]. Callers must not modify it in place
+    (analyze_seat_demand works on a shallow copy).
+    Order: in-process frame -> memory-mapped columnar cache -> parse source.
+    Rebuilds the cache whenever the source file's fingerprint changes and
+    only reaches for the network when nothing is available locally.
+    """
+    with _LOCK:
+        source = _resolve_source()
+        if source is None and not os.path.exists(_paths()[0]) and allow_download:
+            source = _download_source()
+        return _load_or_build(source)
+
+
+def dataset_fingerprint():
+    """Fingerprint of the currently loaded dataset (None until first load)."""
+    with _LOCK:
+        return _MEM["fingerprint"]
+
+
+def source_fingerprint():
+    """
+    Fingerprint load_kaggle_frame() would tag its frame with, without
+    loading anything (a stat + 128 KB read). None if no local data yet.
+    """
+    with _LOCK:
+        source = _resolve_source()
+        if source is not None:
+            return fingerprint(source)
+        data_path, manifest_path = _paths()
+        return _read_manifest(manifest_path).get("fingerprint") if os.path.exists(data_path) else None
+
+
+def clear_memory():
+    with _LOCK:
+        _MEM["fingerprint"], _MEM["df"] = None, None
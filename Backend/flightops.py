@@ -0,0 +1,390 @@
+import os, json, time, random, threading, uuid, heapq, zlib
+from collections import deque
+from datetime import datetime, timezone
+
+TICK_SECONDS = float(os.environ.get("FLIGHTOPS_TICK_SECONDS", 5))
+DELTA_HISTORY = int(os.environ.get("FLIGHTOPS_DELTA_HISTORY", 500))
+SIM_FLIGHTS = int(os.environ.get("FLIGHTOPS_FLIGHTS", 2000))   # live flights per day
+SIM_SEED = int(os.environ.get("FLIGHTOPS_SEED", 7))
+
+
+def _diff(old, new):
+    """(changed items, removed keys) between two {key: item} maps."""
+    changed = [v for k, v in new.items() if old.get(k) != v]
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+# ============================================================
+# 📡 Sequenced delta feed (shared by SSE streams and polling)
+# ============================================================
+class FlightOpsFeed:
+    """
+    Holds the current ops state and a ring buffer of numbered deltas.
+    The source is stepped at most once per `tick` seconds no matter how
+    many clients are connected; clients then only receive what changed.
+    Event ids are "<epoch>-<seq>": the epoch is per process, so an id from
+    another worker or a previous run forces a fresh snapshot.
+    """
+
+    def __init__(self, source, tick=TICK_SECONDS, history=DELTA_HISTORY):
+        self.source = source  # () -> (flights, disruptions)
+        self.tick = float(tick)
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.generated_at = None
+        self.flights = {}
+        self.disruptions = {}
+        self._deltas = deque(maxlen=history)
+        self._next_tick = 0.0
+        self._cond = threading.Condition()
+
+    def event_id(self, seq=None):
+        return f"{self.epoch}-{self.seq if seq is None else seq}"
+
+    def parse_id(self, event_id):
+        """seq for an id issued by this feed, else None."""
+        epoch, _, seq = (event_id or "").rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def advance(self):
+        """Steps the source if a tick is due. Returns the current seq."""
+        with self._cond:
+            now = time.monotonic()
+            if now < self._next_tick:
+                return self.seq
+            self._next_tick = now + self.tick
+            flights, disruptions = self.source()
+            flights = {f["flightNo"]: f for f in flights}
+            disruptions = {d["id"]: d for d in disruptions}
+            fc, fr = _diff(self.flights, flights)
+            dc, dr = _diff(self.disruptions, disruptions)
+            self.flights, self.disruptions = flights, disruptions
+            if fc or fr or dc or dr or self.seq == 0:
+                self.seq += 1
+                self.generated_at = datetime.utcnow().isoformat()
+                self._deltas.append({
+                    "seq": self.seq,
+                    "generatedAt": self.generated_at,
+                    "flights": {"changed": fc, "removed": fr},
+                    "disruptions": {"changed": dc, "removed": dr},
+                })
+                self._cond.notify_all()
+            return self.seq
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "seq": self.seq,
+                "generatedAt": self.generated_at,
+                "flights": list(self.flights.values()),
+                "disruptions": list(self.disruptions.values()),
+            }
+
+    def deltas_since(self, seq):
+        """Deltas after `seq`, or None when they've left the buffer (send a snapshot)."""
+        with self._cond:
+            if seq is None or seq > self.seq:
+                return None
+            if seq == self.seq:
+                return []
+            if not self._deltas or self._deltas[0]["seq"] > seq + 1:
+                return None
+            return [d for d in self._deltas if d["seq"] > seq]
+
+    def wait(self, seq, timeout):
+        """Blocks until the feed moves past `seq` or `timeout` elapses."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.advance()
+            with self._cond:
+                now = time.monotonic()
+                if self.seq != seq or now >= deadline:
+                    return self.seq
+                self._cond.wait(max(0.01, min(deadline, self._next_tick) - now))
+
+
+def sse(event, data, event_id=None):
+    """One Server-Sent Events frame."""
+    head = f"id: {event_id}\n" if event_id else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+# ============================================================
+# 🛫 Event-driven ops simulator
+# ============================================================
+BUCKET_SECONDS = 600        # departure-window index granularity
+BOARDING_LEAD = 30 * 60
+ROLL_SECONDS = 3600
+WINDOW_BEHIND = 2 * 3600    # flights kept after their departure
+CAUSES = ("TECHNICAL", "ATC", "AIRPORT", "CREW")
+
+
+class Flight:
+    __slots__ = ("fid", "flight_no", "route", "sched", "est", "status", "delay", "cause", "version")
+
+    def __init__(self, fid, flight_no, route, sched):
+        self.fid, self.flight_no, self.route = fid, flight_no, route
+        self.sched = self.est = sched  # epoch seconds
+        self.status, self.delay, self.cause, self.version = "ON_TIME", 0, None, 0
+
+    def to_dict(self):
+        return {
+            "flightNo": self.flight_no,
+            "route": self.route,
+            "schedDep": _hhmm(self.sched),
+            "estDep": _hhmm(self.est),
+            "status": self.status,
+            "delayMin": self.delay,
+            "cause": self.cause,
+        }
+
+
+def _hhmm(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%H:%M")
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class OpsSimulator:
+    """
+    Persistent schedule of ~n_flights per day that moves on a priority-queue
+    event clock (boarding, departure, arrival, random delays, cancellations,
+    weather cells). The clock is driven lazily: every read first applies
+    the events that are due. Indexes by route, status and estimated
+    departure bucket keep filtered reads proportional to the result size.
+    """
+
+    def __init__(self, routes, n_flights=SIM_FLIGHTS, seed=SIM_SEED, clock=time.time):
+        self.routes = list(routes)
+        self.n_flights = int(n_flights)
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0             # bumped by every applied event
+        self.flights = {}            # fid -> Flight
+        self.by_route = {r: set() for r in self.routes}
+        self.by_status = {}
+        self.by_bucket = {}          # est // BUCKET_SECONDS -> set(fid)
+        self.late = set()            # delayed or cancelled fids
+        self.route_delay = {r: [0, 0] for r in self.routes}  # [sum minutes, delayed flights]
+        self.weather = {}            # disruption id -> dict
+        self.duration = {r: 60 + zlib.crc32(r.encode()) % 90 for r in self.routes}
+        self._events = []
+        self._eseq = 0
+        self._next_fid = 0
+        self._lock = threading.RLock()
+
+        start = int(self.clock()) - WINDOW_BEHIND
+        self.now = start
+        self.horizon = start + 24 * 3600
+        for _ in range(self.n_flights):
+            self._add_flight(self.rng.uniform(start, self.horizon))
+        self._push(start + ROLL_SECONDS, "roll")
+        self._push(start + self._gap(), "disrupt")
+        self._push(start + self.rng.uniform(0, 3 * 3600), "weather")
+        self.advance()
+
+    # ---- event plumbing ----
+    def _push(self, at, kind, fid=None, data=None):
+        version = self.flights[fid].version if fid is not None else 0
+        heapq.heappush(self._events, (at, self._eseq, kind, fid, version, data))
+        self._eseq += 1
+
+    def _gap(self):
+        # ~25% of flights pick up a delay/cancellation per day
+        return self.rng.expovariate(self.n_flights * 0.25 / 86400)
+
+    def advance(self, now=None):
+        """Applies all events due by `now` (default: wall clock). Returns the version."""
+        now = int(self.clock() if now is None else now)
+        with self._lock:
+            while self._events and self._events[0][0] <= now:
+                at, _, kind, fid, version, data = heapq.heappop(self._events)
+                self.now = at
+                if fid is not None:
+                    f = self.flights.get(fid)
+                    if f is None or f.version != version:
+                        continue  # flight retired or rescheduled since
+                getattr(self, f"_on_{kind}")(fid, data)
+                self.version += 1
+            self.now = max(self.now, now)
+            return self.version
+
+    # ---- index maintenance ----
+    def _index(self, f, add=True):
+        op = set.add if add else set.discard
+        op(self.by_route.setdefault(f.route, set()), f.fid)
+        op(self.by_status.setdefault(f.status, set()), f.fid)
+        op(self.by_bucket.setdefault(int(f.est // BUCKET_SECONDS), set()), f.fid)
+
+    def _set_status(self, f, status):
+        self.by_status[f.status].discard(f.fid)
+        f.status = status
+        self.by_status.setdefault(status, set()).add(f.fid)
+        if status == "CANCELLED":
+            self.late.add(f.fid)
+
+    def _add_flight(self, sched):
+        fid = self._next_fid
+        self._next_fid += 1
+        f = Flight(fid, f"FD{1000 + fid % 9000}", self.rng.choice(self.routes), int(sched))
+        self.flights[fid] = f
+        self._index(f)
+        self._schedule_departure(f)
+
+    def _schedule_departure(self, f):
+        if f.est - BOARDING_LEAD > self.now:
+            self._push(f.est - BOARDING_LEAD, "board", f.fid)
+        self._push(f.est, "depart", f.fid)
+
+    def _delay(self, f, minutes, cause):
+        if f.status in ("IN_AIR", "LANDED", "CANCELLED"):
+            return
+        agg = self.route_delay.setdefault(f.route, [0, 0])
+        if not f.delay:
+            agg[1] += 1
+        agg[0] += minutes
+        self._index(f, add=False)
+        f.est += minutes * 60
+        f.delay += minutes
+        f.cause = cause
+        f.version += 1  # invalidates queued board/depart events
+        self._index(f)
+        self.late.add(f.fid)
+        self._set_status(f, "DELAYED")
+        self._schedule_departure(f)
+
+    def _retire(self, f):
+        self._index(f, add=False)
+        if f.delay:
+            agg = self.route_delay[f.route]
+            agg[0] -= f.delay
+            agg[1] -= 1
+        self.late.discard(f.fid)
+        del self.flights[f.fid]
+
+    # ---- event handlers ----
+    def _on_board(self, fid, _):
+        self._set_status(self.flights[fid], "BOARDING")
+
+    def _on_depart(self, fid, _):
+        f = self.flights[fid]
+        self._set_status(f, "IN_AIR")
+        self._push(f.est + self.duration.get(f.route, 90) * 60, "arrive", fid)
+
+    def _on_arrive(self, fid, _):
+        self._set_status(self.flights[fid], "LANDED")
+
+    def _on_disrupt(self, _fid, _data):
+        # a random not-yet-departed flight in the next 6 hours
+        candidates = self._window_ids(self.now, self.now + 6 * 3600)
+        candidates = [i for i in candidates if self.flights[i].status in ("ON_TIME", "DELAYED", "BOARDING")]
+        if candidates:
+            f = self.flights[self.rng.choice(sorted(candidates))]
+            if self.rng.random() < 0.08:
+                f.version += 1
+                self._set_status(f, "CANCELLED")
+                f.cause = self.rng.choice(CAUSES)
+            else:
+                self._delay(f, self.rng.choice((10, 15, 20, 30, 45, 60)), self.rng.choice(CAUSES))
+        self._push(self.now + self._gap(), "disrupt")
+
+    def _on_weather(self, _fid, _data):
+        airports = sorted({a for r in self.routes for a in r.split("->")})
+        airport = self.rng.choice(airports)
+        until = self.now + self.rng.randint(45, 120) * 60
+        severity = self.rng.choice(("LOW", "MEDIUM", "HIGH"))
+        minutes = {"LOW": 15, "MEDIUM": 30, "HIGH": 60}[severity]
+        hit = []
+        for fid in sorted(self._window_ids(self.now, until)):
+            f = self.flights[fid]
+            if f.route.startswith(airport + "->") and f.status in ("ON_TIME", "DELAYED", "BOARDING"):
+                self._delay(f, minutes, "WEATHER")
+                hit.append(f.flight_no)
+        wid = f"wx-{self._eseq}"
+        self.weather[wid] = {
+            "id": wid,
+            "type": "WEATHER",
+            "severity": severity,
+            "message": f"Weather impact near {airport} causing delays.",
+            "affectedFlights": hit,
+            "updatedAt": _iso(self.now),
+        }
+        self._push(until, "weather_clear", data=wid)
+        self._push(self.now + self.rng.uniform(2, 5) * 3600, "weather")
+
+    def _on_weather_clear(self, _fid, wid):
+        self.weather.pop(wid, None)
+
+    def _on_roll(self, _fid, _data):
+        # retire finished flights, extend the schedule by one hour
+        for fid in list(self.flights):
+            f = self.flights[fid]
+            if f.status in ("LANDED", "CANCELLED") and f.est < self.now - WINDOW_BEHIND:
+                self._retire(f)
+        for _ in range(max(1, self.n_flights * ROLL_SECONDS // 86400)):
+            self._add_flight(self.rng.uniform(self.horizon, self.horizon + ROLL_SECONDS))
+        self.horizon += ROLL_SECONDS
+        self._push(self.now + ROLL_SECONDS, "roll")
+
+    # ---- queries ----
+    def _window_ids(self, start, end):
+        if not self.by_bucket:
+            return set()
+        ids = set()
+        # walk only buckets that can hold flights, however wide the asked window
+        first = max(int(start // BUCKET_SECONDS), min(self.by_bucket))
+        last = min(int(end // BUCKET_SECONDS), max(self.by_bucket))
+        for b in range(first, last + 1):
+            ids.update(i for i in self.by_bucket.get(b, ()) if start <= self.flights[i].est <= end)
+        return ids
+
+    def query(self, route=None, status=None, start=None, end=None, limit=None):
+        """
+        Flights matching every given filter, ordered by estimated departure.
+        Starts from the smallest matching index and filters the rest.
+        """
+        self.advance()
+        with self._lock:
+            sets = []
+            if route:
+                sets.append(self.by_route.get(route, set()))
+            if status:
+                sets.append(self.by_status.get(status, set()))
+            if start is not None or end is not None:
+                lo = self.now - 24 * 3600 if start is None else start
+                hi = self.horizon if end is None else end
+                sets.append(self._window_ids(lo, hi))
+            ids = set.intersection(*sorted(sets, key=len)) if sets else set(self.flights)
+            flights = sorted((self.flights[i] for i in ids), key=lambda f: (f.est, f.flight_no))
+            return [f.to_dict() for f in flights[:limit]]
+
+    def board(self, limit=30, behind=30 * 60, ahead=3 * 3600):
+        """Departure board: flights departing from `behind` ago to `ahead` from now."""
+        now = int(self.clock())
+        return self.query(start=now - behind, end=now + ahead, limit=limit)
+
+    def disruptions(self):
+        self.advance()
+        with self._lock:
+            return [dict(d) for d in self.weather.values()]
+
+    def stats(self):
+        """O(#statuses + #routes) aggregates from the maintained indexes."""
+        self.advance()
+        with self._lock:
+            live = len(self.flights)
+            return {
+                "flights": live,
+                "by_status": {k: len(v) for k, v in self.by_status.items() if v},
+                "on_time_pct": round(100.0 * (live - len(self.late)) / live, 1) if live else 0.0,
+                "avg_delay_by_route": {
+                    r: round(total / n, 1) for r, (total, n) in self.route_delay.items() if n
+                },
+                "active_disruptions": len(self.weather),
+            }
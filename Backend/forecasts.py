@@ -0,0 +1,182 @@
+import os, threading, time
+from datetime import datetime
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+
+import result_cache
+from models import ForecastSnapshot, get_session
+
+REFRESH_SECONDS = float(os.environ.get("FORECAST_REFRESH_SECONDS", 3600))
+# FORECAST_SCHEDULER=0: no background thread; stale snapshots are rebuilt on request
+SCHEDULER_ENABLED = os.environ.get("FORECAST_SCHEDULER", "1").lower() not in ("0", "false", "no")
+SNAPSHOTS_KEPT = int(os.environ.get("FORECAST_SNAPSHOTS_KEPT", 20))  # per tenant
+
+# tenant -> (meta, payload) of the newest snapshot this process has decoded
+_LOCAL = {}
+_LOCK = threading.Lock()
+
+
+# ============================================================
+# 🗄️ Versioned snapshot store (shared by every worker via the DB)
+# ============================================================
+def _meta(row):
+    return {
+        "version": row.version,
+        "inputs_key": row.inputs_key,
+        "trigger": row.trigger,
+        "upload_version": row.upload_version,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+_META_COLS = (ForecastSnapshot.version, ForecastSnapshot.inputs_key, ForecastSnapshot.trigger,
+              ForecastSnapshot.upload_version, ForecastSnapshot.created_at)
+
+
+def latest_meta(tenant):
+    """Metadata of tenant's newest snapshot (None if none) via the (tenant, version) index."""
+    t = ForecastSnapshot
+    with get_session() as s:
+        row = s.execute(select(*_META_COLS).where(t.tenant == tenant).order_by(t.version.desc()).limit(1)).first()
+    return _meta(row) if row else None
+
+
+def latest(tenant):
+    """
+    (meta, payload) of tenant's newest snapshot, or (None, None). The
+    payload is only read and decoded when this process hasn't seen that
+    version yet.
+    """
+    meta = latest_meta(tenant)
+    if meta is None:
+        return None, None
+    with _LOCK:
+        cached = _LOCAL.get(tenant)
+    if cached and cached[0]["version"] == meta["version"]:
+        return cached
+    entry = get(tenant, meta["version"])
+    with _LOCK:
+        _LOCAL[tenant] = entry
+    return entry
+
+
+def get(tenant, version):
+    """(meta, payload) of one stored version, or (None, None)."""
+    t = ForecastSnapshot
+    with get_session() as s:
+        row = s.execute(select(*_META_COLS, t.payload).where(t.tenant == tenant, t.version == version)).first()
+    if row is None:
+        return None, None
+    return _meta(row), result_cache.decode(row.payload)
+
+
+def list_versions(tenant):
+    t = ForecastSnapshot
+    with get_session() as s:
+        rows = s.execute(select(*_META_COLS).where(t.tenant == tenant).order_by(t.version.desc())).all()
+    return [_meta(r) for r in rows]
+
+
+def tenants():
+    with get_session() as s:
+        return list(s.scalars(select(ForecastSnapshot.tenant).distinct()))
+
+
+def publish(tenant, payload, inputs_key, trigger=None, upload_version=None):
+    """
+    Stores payload as tenant's next snapshot version unless the newest one
+    was already built from the same inputs. Returns the new version or
+    None when skipped. Keeps the SNAPSHOTS_KEPT newest versions.
+    """
+    t = ForecastSnapshot
+    blob = result_cache.encode(payload)
+    for _ in range(3):
+        with get_session() as s:
+            newest = s.execute(select(t.version, t.inputs_key).where(t.tenant == tenant)
+                               .order_by(t.version.desc()).limit(1)).first()
+            if newest and newest.inputs_key == inputs_key:
+                return None
+            version = (newest.version if newest else 0) + 1
+            s.add(t(tenant=tenant, version=version, inputs_key=inputs_key, trigger=trigger,
+                    upload_version=upload_version, payload=blob, created_at=datetime.utcnow()))
+            try:
+                s.flush()
+            except IntegrityError:  # another worker took this version; re-check
+                s.rollback()
+                continue
+            s.execute(delete(t).where(t.tenant == tenant, t.version <= version - SNAPSHOTS_KEPT))
+            s.commit()
+        print(f"🗓️ Forecast snapshot v{version} for '{tenant}' ({trigger})")
+        return version
+    return None
+
+
+# ============================================================
+# ⏲️ Background refresher
+# ============================================================
+class ForecastScheduler:
+    """
+    Rebuilds forecast snapshots off the request path: every `interval`
+    seconds for all known tenants, and right away for tenants passed to
+    trigger() (e.g. after a new upload). prepare(tenant) must be cheap and
+    return (inputs_key, upload_version, build) where build() produces the
+    payload; build only runs when inputs_key differs from the newest
+    snapshot's.
+    """
+
+    def __init__(self, prepare, interval=REFRESH_SECONDS, default_tenants=()):
+        self.prepare = prepare
+        self.interval = interval
+        self.default_tenants = tuple(default_tenants)
+        self._pending = {}  # tenant -> trigger
+        self._cond = threading.Condition()
+        self._build_lock = threading.Lock()
+        self._thread = None
+        self.last_run = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not SCHEDULER_ENABLED:
+            return self
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="forecast-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def trigger(self, tenant, reason="upload"):
+        with self._cond:
+            self._pending[tenant] = reason
+            self._cond.notify()
+
+    def refresh(self, tenant, reason="request"):
+        """Builds + publishes tenant's snapshot now if its inputs changed. Returns the new version or None."""
+        with self._build_lock:
+            inputs_key, upload_version, build = self.prepare(tenant)
+            newest = latest_meta(tenant)
+            if newest and newest["inputs_key"] == inputs_key:
+                return None
+            return publish(tenant, build(), inputs_key, reason, upload_version)
+
+    def _run(self):
+        next_tick = time.monotonic() + self.interval
+        while True:
+            with self._cond:
+                while not self._pending and time.monotonic() < next_tick:
+                    self._cond.wait(timeout=max(next_tick - time.monotonic(), 0.01))
+                work, self._pending = self._pending, {}
+            if not work:
+                work = {t: "timer" for t in {*self.default_tenants, *tenants()}}
+                next_tick = time.monotonic() + self.interval
+            for tenant, reason in work.items():
+                try:
+                    self.refresh(tenant, reason)
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = f"{tenant}: {e}"
+                    print(f"⚠️ Forecast refresh failed for '{tenant}':", e)
+            self.last_run = datetime.utcnow()
@@ -0,0 +1,193 @@
+import os, json, time, hashlib, shutil, uuid
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, writes stay atomic via os.replace
+    fcntl = None
+
+from dataset_cache import CACHE_DIR, feather
+
+ROLLING_DIR = os.environ.get("ROLLING_STORE_DIR", os.path.join(CACHE_DIR, "rolling"))
+ENABLED = os.environ.get("INCREMENTAL_TRAINING", "1").lower() not in ("0", "false", "no")
+ROLLING_MAX_ROWS = int(os.environ.get("ROLLING_MAX_ROWS", 2_000_000))
+ROLLING_MAX_BATCHES = int(os.environ.get("ROLLING_MAX_BATCHES", 30))
+# relative RMSE increase of the current model on a new batch that forces a full retrain
+DRIFT_THRESHOLD = float(os.environ.get("DRIFT_THRESHOLD", 0.25))
+# share of categorical values unseen by the current model that forces a full retrain
+UNSEEN_THRESHOLD = float(os.environ.get("UNSEEN_CATEGORY_THRESHOLD", 0.2))
+INCREMENTAL_ROUNDS = int(os.environ.get("INCREMENTAL_ROUNDS", 50))
+MAX_TREES = int(os.environ.get("INCREMENTAL_MAX_TREES", 1000))
+
+_Y = "__y__"
+
+
+# ============================================================
+# 🧬 Lineage: the current model per feature-schema family
+# ============================================================
+def family_key(schema_sig, target):
+    return hashlib.sha1(f"{schema_sig}|{target}".encode()).hexdigest()[:20]
+
+
+def _family_dir(family):
+    return os.path.join(ROLLING_DIR, family)
+
+
+@contextmanager
+def family_lock(family):
+    """Exclusive cross-process lock on one family's directory (lineage + batches)."""
+    os.makedirs(_family_dir(family), exist_ok=True)
+    with open(os.path.join(_family_dir(family), ".lock"), "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _tmp_path(family):
+    # unique per writer, and never matching the batch-* pattern readers list
+    return os.path.join(_family_dir(family), f"tmp-{os.getpid()}-{uuid.uuid4().hex}")
+
+
+def get_lineage(family):
+    try:
+        with open(os.path.join(_family_dir(family), "lineage.json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def set_lineage(family, **info):
+    with family_lock(family):
+        tmp = _tmp_path(family)
+        with open(tmp, "w") as fh:
+            json.dump({**info, "updated_at": time.time()}, fh)
+        os.replace(tmp, os.path.join(_family_dir(family), "lineage.json"))
+
+
+def reset(family):
+    shutil.rmtree(_family_dir(family), ignore_errors=True)
+
+
+# ============================================================
+# 🗂️ Rolling dataset store (encoded feature batches on disk)
+# ============================================================
+def _batch_files(family):
+    d = _family_dir(family)
+    if not os.path.isdir(d):
+        return []
+    return sorted(os.path.join(d, f) for f in os.listdir(d) if f.startswith("batch-"))
+
+
+def _content_hash(frame):
+    h = hashlib.sha1("|".join(map(str, frame.columns)).encode())
+    h.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def append_batch(family, X, y):
+    """
+    Stores one encoded batch, then trims the store to the row/batch limits.
+    A batch whose content is already stored (same data analyzed again) is
+    skipped. Returns False in that case.
+    """
+    frame = X.assign(**{_Y: y.to_numpy()}).reset_index(drop=True)
+    digest = _content_hash(frame)
+    with family_lock(family):
+        files = _batch_files(family)
+        if any(os.path.basename(f).split(".")[0].endswith(f"-{digest}") for f in files):
+            return False
+        # written under a temp name, so readers never see a partial batch
+        tmp, ext = _tmp_path(family), (".feather" if feather is not None else ".pkl")
+        if feather is not None:
+            feather.write_feather(frame, tmp)
+        else:
+            frame.to_pickle(tmp)
+        path = os.path.join(_family_dir(family), f"batch-{time.time_ns()}-{digest}{ext}")
+        os.replace(tmp, path)
+        files.append(path)
+        rows = {f: _batch_rows(f) for f in files}
+        while (len(files) > ROLLING_MAX_BATCHES or sum(rows[f] for f in files) > ROLLING_MAX_ROWS) and len(files) > 1:
+            os.remove(files.pop(0))
+    return True
+
+
+def _batch_rows(path):
+    if path.endswith(".feather"):
+        return feather.read_table(path, memory_map=True).num_rows
+    return len(pd.read_pickle(path))
+
+
+def _read_batch(path):
+    if path.endswith(".feather"):
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_pickle(path)
+
+
+def load_store(family, columns):
+    """All stored batches that still match `columns`, as (X, y) with unified categories."""
+    frames = []
+    for f in _batch_files(family):
+        try:
+            frame = _read_batch(f)
+        except FileNotFoundError:  # trimmed by a concurrent append
+            continue
+        if list(frame.columns) == list(columns) + [_Y]:
+            frames.append(frame)
+    if not frames:
+        return None, None
+    merged = concat_aligned(frames)
+    return merged.drop(columns=_Y), merged[_Y]
+
+
+# ============================================================
+# 🏷️ Category alignment + drift
+# ============================================================
+def concat_aligned(frames):
+    """Concats frames whose categorical columns may have different categories."""
+    cat_cols = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    cats = {}
+    for c in cat_cols:
+        cats[c] = list(dict.fromkeys(v for f in frames for v in f[c].astype("category").cat.categories))
+    aligned = [align_categories(f, cats)[0] for f in frames]
+    return pd.concat(aligned, ignore_index=True)
+
+
+def align_categories(X, categories):
+    """
+    Re-encodes X's categorical columns onto `categories` ({col: [values]}).
+    Returns (X, unseen_share): the largest share of non-null values in any
+    column that the target categories don't contain (they become NaN).
+    """
+    unseen = 0.0
+    updates = {}
+    for c, cats in categories.items():
+        if c not in X.columns:
+            continue
+        s = X[c] if isinstance(X[c].dtype, pd.CategoricalDtype) else X[c].astype("category")
+        before = int(s.notna().sum())
+        s = s.cat.set_categories(cats)
+        if before:
+            unseen = max(unseen, 1.0 - int(s.notna().sum()) / before)
+        updates[c] = s
+    if updates:
+        X = X.assign(**updates)
+    return X, unseen
+
+
+def rmse(booster, X, y):
+    if len(X) == 0:
+        return 0.0
+    return float(np.sqrt(np.mean((booster.predict(X) - np.asarray(y, dtype=float)) ** 2)))
+
+
+def drift_score(booster, X, y, ref_rmse):
+    """Relative RMSE increase of `booster` on a new batch vs its reference RMSE."""
+    if not ref_rmse:
+        return 0.0
+    return rmse(booster, X, y) / ref_rmse - 1.0
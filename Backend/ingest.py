@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+import metrics
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+DEFAULT_CHUNKSIZE = 200_000
+DEFAULT_SAMPLE_ROWS = 20_000
+
+
+# ============================================================
+# 📥 Chunked CSV reading with sample-inferred dtypes
+# ============================================================
+def _open_encoding(path):
+    """
+    utf-8 if the head decodes cleanly, else latin-1 (matches read_any_file).
+    Only the first 1 MB is checked, so readers decode with
+    encoding_errors="replace" rather than abort on a stray byte later on.
+    """
+    with open(path, "rb") as fh:
+        head = fh.read(1 << 20)
+    try:
+        head.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # a multi-byte char cut at the 1 MB boundary is still utf-8
+        return "utf-8" if e.start >= len(head) - 3 else "latin1"
+
+
+@metrics.timed("read_sample")
+def read_sample(path, nrows=DEFAULT_SAMPLE_ROWS, encoding=None):
+    encoding = encoding or _open_encoding(path)
+    return pd.read_csv(path, nrows=nrows, encoding=encoding, encoding_errors="replace"), encoding
+
+
+def infer_dtypes(sample):
+    """
+    Column dtypes every chunk is brought to so they don't drift between chunks:
+    numerics -> float64 (a later chunk may contain NaN), everything else -> object.
+    """
+    return {c: ("float64" if pd.api.types.is_numeric_dtype(sample[c]) else "object") for c in sample.columns}
+
+
+def iter_csv_chunks(path, chunksize=DEFAULT_CHUNKSIZE, dtype=None, encoding=None):
+    """
+    Yields DataFrame chunks. Columns `dtype` marks float64 are read as text
+    and coerced per chunk, so a stray "N/A" or "-" far past the sample
+    becomes NaN instead of aborting the read mid-stream.
+    """
+    encoding = encoding or _open_encoding(path)
+    numeric = [c for c, t in (dtype or {}).items() if t == "float64"]
+    read_dtype = {c: "object" for c in dtype} if dtype else None
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=read_dtype, encoding=encoding,
+                         encoding_errors="replace", low_memory=True)
+    with reader:
+        it = iter(reader)
+        while True:
+            with metrics.stage("read_chunk"):
+                chunk = next(it, None)
+                if chunk is not None:
+                    for c in numeric:
+                        if c in chunk.columns:
+                            chunk[c] = pd.to_numeric(chunk[c], errors="coerce").astype("float64")
+            if chunk is None:
+                return
+            yield chunk
+
+
+@metrics.timed("guess_date_format")
+def guess_date_format(series, probes=200):
+    """
+    strftime format for a date column, picked from month-first and day-first
+    guesses by which parses more of a small probe (None if neither fits).
+    """
+    vals = series.dropna().astype(str)
+    if vals.empty:
+        return None
+    # spread probes over the whole sample, not just the first rows
+    vals = vals.iloc[np.linspace(0, len(vals) - 1, min(probes, len(vals))).astype(int)]
+    best, best_ok = None, 0
+    for dayfirst in (False, True):
+        fmt = guess_datetime_format(vals.iloc[0], dayfirst=dayfirst)
+        if not fmt:
+            continue
+        ok = pd.to_datetime(vals, format=fmt, errors="coerce").notna().sum()
+        if ok > best_ok:
+            best, best_ok = fmt, ok
+    return best if best_ok >= len(vals) * 0.9 else None
+
+
+# ============================================================
+# 📊 Out-of-core aggregation + bounded sampling
+# ============================================================
+class RunningMean:
+    """Group means accumulated chunk by chunk as (sum, count) per key."""
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+
+    def update(self, keys, values):
+        g = pd.DataFrame({"k": keys, "v": values}).dropna().groupby("k")["v"].agg(["sum", "count"])
+        for k, row in g.iterrows():
+            self.sums[k] = self.sums.get(k, 0.0) + float(row["sum"])
+            self.counts[k] = self.counts.get(k, 0) + int(row["count"])
+
+    def means(self, ndigits=2):
+        return {k: round(self.sums[k] / self.counts[k], ndigits) for k in sorted(self.sums) if self.counts[k]}
+
+
+class Reservoir:
+    """
+    Uniform fixed-size row sample over a stream (bottom-k on random priorities),
+    so memory stays at `size` rows no matter how many chunks pass through.
+    """
+
+    def __init__(self, size, seed=42):
+        self.size = int(size)
+        self.rng = np.random.default_rng(seed)
+        self.frame = None
+        self.seen = 0
+
+    def add(self, chunk):
+        self.seen += len(chunk)
+        chunk = chunk.assign(__prio__=self.rng.random(len(chunk)))
+        merged = chunk if self.frame is None else pd.concat([self.frame, chunk], ignore_index=True)
+        if len(merged) > self.size:
+            merged = merged.nsmallest(self.size, "__prio__")
+        self.frame = merged.reset_index(drop=True)
+
+    def sample(self):
+        if self.frame is None:
+            return pd.DataFrame()
+        return self.frame.drop(columns="__prio__")
@@ -0,0 +1,284 @@
+import os, time, uuid, threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
+
+from dataset_cache import CACHE_DIR
+
+UPLOAD_DIR = os.path.join(CACHE_DIR, "uploads")
+MAX_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", max(1, min(2, (os.cpu_count() or 2) - 1))))
+MAX_QUEUE = int(os.environ.get("ANALYSIS_QUEUE_MAX", 8))      # queued + running
+MAX_HISTORY = int(os.environ.get("ANALYSIS_JOB_HISTORY", 200))  # finished jobs kept
+# files analyzed at once by batch requests (shared by all of them)
+BATCH_WORKERS = int(os.environ.get("ANALYSIS_BATCH_WORKERS", max(1, min(4, os.cpu_count() or 1))))
+
+# queued -> running -> done | failed | cancelled
+ACTIVE = ("queued", "running")
+
+# analysis stage (metrics.stage name) -> rough share of the job done when it starts;
+# the streaming path runs detect_schema + aggregate_chunk before the in-memory stages
+STAGE_PROGRESS = {
+    "result_cache_lookup": 0.02, "read_file": 0.05, "detect_schema": 0.1, "aggregate_chunk": 0.3,
+    "normalize_cols": 0.35, "build_feature_matrix": 0.4, "training": 0.5, "predict": 0.8,
+    "trends": 0.85, "per_route_forecast": 0.9,
+}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _worker_init(n_workers=MAX_WORKERS):
+    # Forked workers inherit the parent's pooled DB connections; drop them.
+    from models import get_engine
+    get_engine().dispose(close=False)
+    # each worker trains in its own process: split the cores between them
+    import training_budget
+    share = max(1, training_budget.TOTAL_THREADS // n_workers)
+    training_budget.THREADS.set_total(share, per_fit=share)
+
+
+def _write_stage(path, name):
+    # tmp + replace so the parent never reads a half-written file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        fh.write(name)
+    os.replace(tmp, path)
+
+
+def _read_stage(path):
+    try:
+        with open(path) as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+def run_upload_analysis(path, filename, content_hash, deterministic=True, stage_path=None):
+    """
+    Runs in a worker process: analyze the spooled upload. CSVs above
+    STREAM_THRESHOLD_BYTES go through the chunked streaming analyzer.
+    With stage_path, the name of each analysis stage is written there as
+    it starts so the parent can report progress.
+    """
+    from contextlib import nullcontext
+    from werkzeug.datastructures import FileStorage
+    import metrics
+    from analysis import read_any_file, analyze_cached, analyze_seat_demand_streaming, STREAM_THRESHOLD_BYTES
+    track = metrics.on_stage(lambda name: _write_stage(stage_path, name)) if stage_path else nullcontext()
+    try:
+        with track:
+            is_csv = not (filename or "").lower().endswith((".xlsx", ".xls"))
+            if is_csv and os.path.getsize(path) > STREAM_THRESHOLD_BYTES:
+                result, _ = analyze_cached(path, content_hash, deterministic, analyzer=analyze_seat_demand_streaming)
+                return result
+            with open(path, "rb") as fh:
+                upload = FileStorage(stream=fh, filename=filename)
+                result, _ = analyze_cached(lambda: read_any_file(upload), content_hash, deterministic)
+            return result
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_BATCH_POOL = None
+_BATCH_LOCK = threading.Lock()
+
+
+def batch_pool():
+    """Process pool for batch analyses, created on first use (BATCH_WORKERS processes)."""
+    global _BATCH_POOL
+    with _BATCH_LOCK:
+        if _BATCH_POOL is None:
+            _BATCH_POOL = ProcessPoolExecutor(max_workers=BATCH_WORKERS, initializer=_worker_init,
+                                              initargs=(BATCH_WORKERS,))
+    return _BATCH_POOL
+
+
+def reset_batch_pool(broken):
+    """Drops a batch pool whose worker died (BrokenProcessPool); the next batch_pool() starts a fresh one."""
+    global _BATCH_POOL
+    with _BATCH_LOCK:
+        if _BATCH_POOL is not broken:
+            return  # already replaced by another request
+        _BATCH_POOL = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    print("⚠️ Batch worker pool broke; recreating it")
+
+
+def submit_batch(fn, *args):
+    """
+    batch_pool().submit that retries once on a fresh pool if the current
+    one is broken. Returns (pool, future).
+    """
+    pool = batch_pool()
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        reset_batch_pool(pool)
+        pool = batch_pool()
+        return pool, pool.submit(fn, *args)
+
+
+class JobManager:
+    """
+    Bounded background analysis queue on a ProcessPoolExecutor.
+    Job records live in this process; on_success(job, result) is called
+    here (not in the worker) once a job finishes without error.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_queue=MAX_QUEUE, on_success=None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.on_success = on_success
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None  # created on first submit, never at import
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_worker_init)
+            return self._executor
+
+    def _reset_pool(self, broken):
+        # a worker died (OOM kill, segfault): every pending future of that pool fails
+        # with BrokenProcessPool, so swap in a fresh executor for later jobs
+        with self._lock:
+            if self._executor is not broken:
+                return  # another job already replaced it
+            self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+        print("⚠️ Analysis worker pool broke; recreating it")
+
+    def active_count(self):
+        return sum(1 for j in self._jobs.values() if j["status"] in ACTIVE)
+
+    def submit(self, fn, *args, name=None, track_stages=False, **meta):
+        """
+        Queues fn(*args) in the worker pool. With track_stages, fn also gets
+        stage_path= and writes its current analysis stage there (see
+        run_upload_analysis), which drives the job's stage/progress fields.
+        """
+        with self._lock:
+            if self.active_count() >= self.max_queue:
+                raise QueueFull(f"analysis queue is full ({self.max_queue} jobs)")
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id, "name": name, "status": "queued", "stage": None, "progress": 0.0,
+                "created_at": time.time(), "started_at": None, "finished_at": None,
+                "error": None, "result": None, **meta,
+            }
+            self._jobs[job_id] = job
+            self._trim()
+        kwargs = {}
+        if track_stages:
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+            job["_stage_path"] = kwargs["stage_path"] = os.path.join(UPLOAD_DIR, f"{job_id}.stage")
+        pool = self._pool()
+        try:
+            fut = pool.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            fut = self._pool().submit(fn, *args, **kwargs)
+        job["_pool"], job["_future"] = pool, fut
+        fut.add_done_callback(lambda f, j=job: self._finish(j, f))
+        return self.get(job_id)
+
+    def complete(self, result, name=None, **meta):
+        """Records an already-finished job (e.g. a result-cache hit)."""
+        with self._lock:
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._jobs[job_id] = {
+                "id": job_id, "name": name, "status": "done", "stage": None, "progress": 1.0,
+                "created_at": now, "started_at": now, "finished_at": now,
+                "error": None, "result": result, **meta,
+            }
+            self._trim()
+        if self.on_success and "error" not in result:
+            self.on_success(self._jobs[job_id], result)
+        return self.get(job_id)
+
+    def _finish(self, job, fut):
+        job["finished_at"] = time.time()
+        # the worker removes its input itself unless it never ran or died
+        for key in ("_cleanup", "_stage_path"):
+            if job.get(key) and os.path.exists(job[key]):
+                os.remove(job[key])
+        try:
+            result = fut.result()
+        except CancelledError:
+            job["status"] = "cancelled"
+            return
+        except BrokenProcessPool:
+            job["status"], job["error"] = "failed", "analysis worker process died (out of memory?)"
+            self._reset_pool(job["_pool"])
+            return
+        except Exception as e:
+            job["status"], job["error"] = "failed", str(e)
+            return
+        if job["status"] == "cancelled":
+            return  # cancel requested while running: discard the result
+        if "error" in result:
+            job["status"], job["error"], job["result"] = "failed", result["error"], result
+            return
+        job["status"], job["stage"], job["progress"], job["result"] = "done", None, 1.0, result
+        if self.on_success:
+            try:
+                self.on_success(job, result)
+            except Exception as e:
+                print("⚠️ Job success hook failed:", e)
+
+    def _refresh(self, job):
+        # ProcessPoolExecutor has no "started" hook; poll the future lazily
+        fut = job.get("_future")
+        if job["status"] == "queued" and fut is not None and fut.running():
+            job["status"], job["started_at"] = "running", time.time()
+        if job["status"] == "running" and job.get("_stage_path"):
+            stage = _read_stage(job["_stage_path"])
+            if stage:
+                job["stage"] = stage
+                job["progress"] = max(job["progress"], STAGE_PROGRESS.get(stage, 0.0))
+
+    def _trim(self):
+        finished = [k for k, j in self._jobs.items() if j["status"] not in ACTIVE]
+        for k in finished[: max(0, len(finished) - MAX_HISTORY)]:
+            del self._jobs[k]
+
+    def get(self, job_id, with_result=False):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        self._refresh(job)
+        out = {k: v for k, v in job.items() if not k.startswith("_") and k != "result"}
+        if job["status"] == "queued":
+            ahead = [j for j in self._jobs.values() if j["status"] == "queued" and j["created_at"] < job["created_at"]]
+            out["queue_position"] = len(ahead) + 1
+        if with_result:
+            out["result"] = job["result"]
+        return out
+
+    def list(self):
+        return [self.get(k) for k in reversed(self._jobs)]
+
+    def cancel(self, job_id):
+        """Cancels a queued job; a running one is flagged and its result dropped."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        self._refresh(job)
+        if job["status"] not in ACTIVE:
+            return self.get(job_id)
+        fut = job.get("_future")
+        if fut is not None and fut.cancel():
+            job["status"] = "cancelled"
+        else:
+            job["status"], job["finished_at"] = "cancelled", time.time()
+        return self.get(job_id)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,168 @@
+import threading, time, contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+# seconds; covers cached lookups (ms) up to multi-minute trainings
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, esc)) + "}"
+
+
+def _num(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ============================================================
+# 📈 Minimal Prometheus-style metric types
+# ============================================================
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_num(v)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, s in sorted(self._series.items()):
+                for i, b in enumerate(self.buckets):
+                    lines.append(f"{self.name}_bucket{_labels(names, key + (_num(b),))} {s[i]}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(round(s[-2], 6))}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return lines
+
+
+def snapshot(name, help, samples, kind="gauge"):
+    """Renders values read at scrape time (e.g. cache stats); samples = [(labels dict, value)]."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for labels, v in samples:
+        lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_num(v)}")
+    return lines
+
+
+REQUEST_SECONDS = Histogram("flydash_request_duration_seconds", "HTTP request latency by endpoint.",
+                            ("method", "endpoint", "status"))
+STAGE_SECONDS = Histogram("flydash_stage_duration_seconds", "Analysis pipeline stage latency.", ("stage",))
+DB_QUERIES = Counter("flydash_db_queries_total", "SQL statements executed.", ("endpoint", "op"))
+
+
+# ============================================================
+# ⏱️ Stage timers
+# ============================================================
+_breakdown = contextvars.ContextVar("flydash_stage_breakdown", default=None)
+_listener = contextvars.ContextVar("flydash_stage_listener", default=None)
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a block into STAGE_SECONDS and, inside collect_timings(), into
+    the active per-request breakdown (repeated stages accumulate).
+    """
+    listener = _listener.get()
+    if listener is not None:
+        listener(name)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.observe(dt, stage=name)
+        b = _breakdown.get()
+        if b is not None:
+            b[name] = round(b.get(name, 0.0) + dt, 4)
+
+
+def timed(name):
+    """Decorator form of stage()."""
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+@contextmanager
+def collect_timings():
+    """Collects {stage: seconds} for every stage() run inside the block."""
+    b = {}
+    token = _breakdown.set(b)
+    try:
+        yield b
+    finally:
+        _breakdown.reset(token)
+
+
+@contextmanager
+def on_stage(callback):
+    """Calls callback(stage_name) as each stage() inside the block starts (e.g. job progress)."""
+    token = _listener.set(callback)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+# ============================================================
+# 🗄️ DB query counting
+# ============================================================
+def count_db_queries(engine_cls, endpoint_fn):
+    """Counts every statement run by any engine, labelled by endpoint_fn()."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine_cls, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        op = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+        DB_QUERIES.inc(endpoint=endpoint_fn(), op=op)
+
+
+def render(*extra):
+    """Prometheus text exposition of all built-in metrics plus `extra` line lists."""
+    lines = []
+    for m in (REQUEST_SECONDS, STAGE_SECONDS, DB_QUERIES):
+        lines += m.render()
+    for block in extra:
+        lines += block
+    return "\n".join(lines) + "\n"
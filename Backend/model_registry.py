@@ -0,0 +1,129 @@
+import os, re, json, hashlib, threading, time
+import lightgbm as lgb
+from dataset_cache import CACHE_DIR
+
+MODEL_DIR = os.environ.get("MODEL_REGISTRY_DIR", os.path.join(CACHE_DIR, "models"))
+MAX_MODELS = int(os.environ.get("MODEL_REGISTRY_MAX", 20))
+
+# Bump when training params/features change so stale boosters aren't reused.
+MODEL_VERSION = "3"
+
+_LOADED = {}  # key -> (booster, meta), filled lazily
+_LOCK = threading.RLock()
+
+stats = {"hits": 0, "misses": 0}
+
+# keys are hex digests (model_key); anything else could be a path out of MODEL_DIR
+_KEY_RE = re.compile(r"^[0-9a-f]{16,64}$")
+
+
+def schema_signature(X):
+    """Stable hash of the ordered feature columns and their dtypes."""
+    cols = [(str(c), str(X[c].dtype)) for c in X.columns]
+    return hashlib.sha1(json.dumps(cols).encode()).hexdigest()
+
+
+def model_key(dataset_id, X, **params):
+    blob = json.dumps(
+        {"dataset": dataset_id, "schema": schema_signature(X), "v": MODEL_VERSION, **params},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()[:32]
+
+
+def valid_key(key):
+    return isinstance(key, str) and bool(_KEY_RE.match(key))
+
+
+def _paths(key):
+    if not valid_key(key):
+        raise ValueError(f"invalid model key: {key!r}")
+    return os.path.join(MODEL_DIR, f"{key}.txt"), os.path.join(MODEL_DIR, f"{key}.json")
+
+
+def get_model(key):
+    """Returns (booster, meta) from memory or disk, or None if unknown."""
+    if not valid_key(key):
+        return None
+    with _LOCK:
+        if key in _LOADED:
+            stats["hits"] += 1
+            return _LOADED[key]
+        model_path, meta_path = _paths(key)
+        if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+            stats["misses"] += 1
+            return None
+        try:
+            booster = lgb.Booster(model_file=model_path)
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+        except Exception as e:
+            print("⚠️ Model registry load error:", e)
+            stats["misses"] += 1
+            return None
+        os.utime(meta_path)  # LRU bookkeeping
+        _LOADED[key] = (booster, meta)
+        stats["hits"] += 1
+        print(f"📦 Loaded model {key} from registry")
+        return _LOADED[key]
+
+
+def save_model(key, booster, meta):
+    """Persists booster + meta (features, encodings, target...)."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    model_path, meta_path = _paths(key)
+    meta = {**meta, "key": key, "created_at": time.time()}
+    with _LOCK:
+        booster.save_model(model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        with open(meta_path + ".tmp", "w") as fh:
+            json.dump(meta, fh, default=str)
+        os.replace(meta_path + ".tmp", meta_path)
+        _LOADED[key] = (booster, meta)
+        _enforce_limit()
+    return meta
+
+
+def list_models():
+    """Metadata of every stored model, most recently used first."""
+    if not os.path.isdir(MODEL_DIR):
+        return []
+    out = []
+    for f in os.listdir(MODEL_DIR):
+        if not f.endswith(".json"):
+            continue
+        path = os.path.join(MODEL_DIR, f)
+        try:
+            with open(path) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        meta["last_used_at"] = os.path.getmtime(path)
+        meta["loaded"] = meta.get("key") in _LOADED
+        meta.pop("encodings", None)  # can be large; fetch via get_model
+        out.append(meta)
+    return sorted(out, key=lambda m: m["last_used_at"], reverse=True)
+
+
+def evict(key=None):
+    """Removes one model (or all when key is None). Returns count removed."""
+    if key is not None and not valid_key(key):
+        return 0
+    with _LOCK:
+        keys = [key] if key is not None else [m["key"] for m in list_models() if valid_key(m.get("key"))]
+        removed = 0
+        for k in keys:
+            _LOADED.pop(k, None)
+            hit = False
+            for p in _paths(k):
+                if os.path.exists(p):
+                    os.remove(p)
+                    hit = True
+            removed += hit
+        return removed
+
+
+def _enforce_limit():
+    models = list_models()
+    for meta in models[MAX_MODELS:]:
+        evict(meta["key"])
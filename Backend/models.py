@@ -1,17 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import (
+    Column, Integer, String, Float, DateTime, LargeBinary, Index, create_engine, event,
+    select, update, insert, delete, func, inspect,
+)
+from sqlalchemy.orm import declarative_base, sessionmaker, Session, column_property
 from datetime import datetime
+import os, threading
 
 Base = declarative_base()
 
+DEFAULT_DB_URL = os.environ.get("DATABASE_URL", "sqlite:///passengers.db")
+
 class Passenger(Base):
     __tablename__ = "passengers"
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True)
-    route = Column(String, nullable=False)
-    tier = Column(String, nullable=False)
-    lastBooking = Column(String, nullable=False)
+    # active_history: the rollup listener needs the old value even when the
+    # instance was expired (e.g. by a commit) before the attribute was set
+    route = column_property(Column(String, nullable=False, index=True), active_history=True)
+    tier = column_property(Column(String, nullable=False, index=True), active_history=True)
+    lastBooking = column_property(Column(String, nullable=False, index=True), active_history=True)  # ISO date, sorts lexically
 
 
 # 🆕 NEW: Table for storing past seat demand analyses
@@ -23,11 +31,273 @@ class SeatDemandHistory(Base):
     predicted_demand = Column(Float, nullable=True)
     festive_avg = Column(Float, nullable=True)
     message = Column(String, nullable=True)
+    records_analyzed = Column(Integer, nullable=True)
+    target_column = Column(String, nullable=True)
+    payload = Column(LargeBinary, nullable=True)  # full result, zlib'd JSON (NULL for old rows)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# ⚡ Content-addressed cache of analyze_seat_demand results (zlib'd JSON)
+class AnalysisResultCache(Base):
+    __tablename__ = "analysis_result_cache"
+    key = Column(String(64), primary_key=True)  # sha256(content hash + params)
+    payload = Column(LargeBinary, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
-    
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# 📊 Pre-aggregated passenger counts, kept in sync on every Passenger write
+class PassengerRollup(Base):
+    __tablename__ = "passenger_rollups"
+    dim = Column(String, primary_key=True)   # "route" | "tier" | "day"
+    key = Column(String, primary_key=True)   # route name, tier name or ISO date
+    count = Column(Integer, nullable=False, default=0)
+
+
+# 🔁 Latest analysis per tenant, shared by every worker process (see shared_state.py)
+class AnalysisState(Base):
+    __tablename__ = "analysis_state"
+    tenant = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)  # bumped on every publish
+    source = Column(String, nullable=True)
+    dataset_name = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    payload = Column(LargeBinary, nullable=False)  # zlib'd JSON result
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+# 🗓️ Versioned seasonal-forecast snapshots per tenant (see forecasts.py)
+class ForecastSnapshot(Base):
+    __tablename__ = "forecast_snapshots"
+    __table_args__ = (Index("ix_forecast_snapshots_tenant_version", "tenant", "version", unique=True),)
+    id = Column(Integer, primary_key=True)
+    tenant = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+    inputs_key = Column(String(40), nullable=False)  # hash of what the forecast was built from
+    trigger = Column(String, nullable=True)           # "timer" | "upload" | "request" | ...
+    upload_version = Column(Integer, nullable=True)   # tenant's AnalysisState version used
+    payload = Column(LargeBinary, nullable=False)     # zlib'd JSON forecast
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+ROLLUP_DIMS = ("route", "tier", "day")
+
+
+def rollup_keys(route, tier, last_booking):
+    return {"route": route, "tier": tier, "day": (last_booking or "")[:10]}
+
+
+def apply_passenger_rollup(conn, deltas):
+    """
+    deltas: {(dim, key): +n/-n}. Uses UPDATE-then-INSERT so it works on
+    any backend; rows that drop to zero are deleted.
+    """
+    t = PassengerRollup.__table__
+    for (dim, key), d in deltas.items():
+        if not d or key is None:
+            continue
+        res = conn.execute(
+            update(t).where(t.c.dim == dim, t.c.key == key).values(count=t.c.count + d)
+        )
+        if res.rowcount == 0 and d > 0:
+            conn.execute(insert(t).values(dim=dim, key=key, count=d))
+        elif d < 0:
+            conn.execute(delete(t).where(t.c.dim == dim, t.c.key == key, t.c.count <= 0))
+
+
+def rebuild_passenger_rollups(conn):
+    """Recomputes every rollup row from scratch with GROUP BY queries."""
+    t = PassengerRollup.__table__
+    p = Passenger.__table__
+    conn.execute(delete(t))
+    groupings = {
+        "route": p.c.route,
+        "tier": p.c.tier,
+        "day": func.substr(p.c.lastBooking, 1, 10),
+    }
+    for dim, expr in groupings.items():
+        rows = conn.execute(select(expr, func.count()).group_by(expr)).all()
+        if rows:
+            conn.execute(insert(t), [{"dim": dim, "key": k, "count": n} for k, n in rows])
+
+
+@event.listens_for(Passenger, "after_insert")
+def _rollup_on_insert(mapper, conn, target):
+    keys = rollup_keys(target.route, target.tier, target.lastBooking)
+    apply_passenger_rollup(conn, {(d, k): 1 for d, k in keys.items()})
+
+
+@event.listens_for(Passenger, "after_delete")
+def _rollup_on_delete(mapper, conn, target):
+    keys = rollup_keys(target.route, target.tier, target.lastBooking)
+    apply_passenger_rollup(conn, {(d, k): -1 for d, k in keys.items()})
+
+
+@event.listens_for(Passenger, "after_update")
+def _rollup_on_update(mapper, conn, target):
+    state = inspect(target)
+    old = {}
+    for attr in ("route", "tier", "lastBooking"):
+        hist = state.attrs[attr].history
+        old[attr] = hist.deleted[0] if hist.deleted else getattr(target, attr)
+    before = rollup_keys(old["route"], old["tier"], old["lastBooking"])
+    after = rollup_keys(target.route, target.tier, target.lastBooking)
+    deltas = {}
+    for dim in ROLLUP_DIMS:
+        if before[dim] != after[dim]:
+            deltas[(dim, before[dim])] = deltas.get((dim, before[dim]), 0) - 1
+            deltas[(dim, after[dim])] = deltas.get((dim, after[dim]), 0) + 1
+    apply_passenger_rollup(conn, deltas)
+
+
+# ============================================================
+# 🔔 Passenger change notifications (fired after commit)
+# ============================================================
+_PASSENGER_CHANGE_HOOKS = []
+
+
+def on_passengers_changed(fn):
+    """Registers fn() to run after any commit that wrote Passenger rows."""
+    _PASSENGER_CHANGE_HOOKS.append(fn)
+    return fn
+
+
+def notify_passengers_changed():
+    """Runs the hooks; Core bulk writes that bypass the ORM call this directly."""
+    for fn in _PASSENGER_CHANGE_HOOKS:
+        try:
+            fn()
+        except Exception as e:
+            print("⚠️ Passenger change hook failed:", e)
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_passenger_writes(session, _ctx):
+    if any(isinstance(o, Passenger) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info["passengers_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _fire_passenger_hooks(session):
+    if session.info.pop("passengers_changed", False):
+        notify_passengers_changed()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_passenger_flag(session):
+    session.info.pop("passengers_changed", None)
+
+
+# ============================================================
+# 🔌 Engine registry (one engine + session factory per DB URL)
+# ============================================================
+_ENGINES = {}
+_SESSION_FACTORIES = {}
+_INITIALIZED = set()
+_REGISTRY_LOCK = threading.Lock()
+
+# SQLite pragmas applied to every new DB-API connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",      # readers don't block the writer
+    "synchronous": "NORMAL",    # safe with WAL, far fewer fsyncs
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,       # ms to wait on a locked DB before erroring
+    "cache_size": -16000,       # ~16 MB page cache per connection
+    "temp_store": "MEMORY",
+}
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for key, val in SQLITE_PRAGMAS.items():
+        cur.execute(f"PRAGMA {key}={val}")
+    cur.close()
+
+
+def get_engine(db_url=None):
+    """
+    Returns the process-wide engine for db_url, creating it on first use.
+    SQLite gets WAL + pragmas; other backends get a tuned QueuePool.
+    """
+    db_url = db_url or DEFAULT_DB_URL
+    engine = _ENGINES.get(db_url)
+    if engine is not None:
+        return engine
+    with _REGISTRY_LOCK:
+        engine = _ENGINES.get(db_url)
+        if engine is None:
+            if db_url.startswith("sqlite"):
+                engine = create_engine(
+                    db_url,
+                    future=True,
+                    pool_size=10,
+                    max_overflow=20,
+                    connect_args={"check_same_thread": False, "timeout": 30},
+                )
+                event.listen(engine, "connect", _set_sqlite_pragmas)
+            else:
+                engine = create_engine(
+                    db_url,
+                    future=True,
+                    pool_size=10,
+                    max_overflow=20,
+                    pool_pre_ping=True,
+                    pool_recycle=1800,
+                )
+            _ENGINES[db_url] = engine
+            _SESSION_FACTORIES[db_url] = sessionmaker(bind=engine, future=True, expire_on_commit=False)
+    return engine
+
+
+def _add_missing_columns(engine):
+    """
+    create_all never alters existing tables, so columns added to a model
+    later are appended here (nullable, no default) with ALTER TABLE.
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            have = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in have:
+                    ddl = col.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {ddl}')
+                    print(f"🧱 Added column {table.name}.{col.name}")
+
+
+def init_db(db_url=None):
+    """Creates the schema once per process (call at startup)."""
+    db_url = db_url or DEFAULT_DB_URL
+    engine = get_engine(db_url)
+    if db_url in _INITIALIZED:
+        return engine
+    with _REGISTRY_LOCK:
+        if db_url not in _INITIALIZED:
+            Base.metadata.create_all(engine)
+            _add_missing_columns(engine)
+            # create_all skips indexes on tables that already exist
+            for table in Base.metadata.sorted_tables:
+                for idx in table.indexes:
+                    idx.create(engine, checkfirst=True)
+            # backfill rollups for databases created before the table existed
+            with engine.begin() as conn:
+                has_rollups = conn.scalar(select(func.count()).select_from(PassengerRollup.__table__))
+                has_passengers = conn.scalar(select(func.count()).select_from(Passenger.__table__))
+                if has_passengers and not has_rollups:
+                    rebuild_passenger_rollups(conn)
+            _INITIALIZED.add(db_url)
+    return engine
 
 
-def get_session(db_url="sqlite:///passengers.db"):
-    engine = create_engine(db_url, future=True)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine, future=True)()
+def get_session(db_url=None):
+    """
+    Returns a new Session bound to the shared engine. Callers own it and
+    must close it (or use it as a context manager: `with get_session() as s:`).
+    """
+    db_url = db_url or DEFAULT_DB_URL
+    init_db(db_url)
+    return _SESSION_FACTORIES[db_url]()
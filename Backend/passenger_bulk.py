@@ -0,0 +1,239 @@
+import csv, io, json, os
+from collections import Counter
+from sqlalchemy import select, update, insert, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from models import Passenger, apply_passenger_rollup, rollup_keys, get_engine, notify_passengers_changed
+
+FIELDS = ("name", "email", "route", "tier", "lastBooking")
+IMPORT_BATCH_SIZE = int(os.environ.get("PASSENGER_IMPORT_BATCH", 5000))
+EXPORT_CHUNK = 5000
+_IN_CHUNK = 500  # emails per IN (...) lookup, well under SQLite's variable limit
+
+_t = Passenger.__table__
+
+
+class BulkError(ValueError):
+    pass
+
+
+def clean(record, partial=False):
+    """
+    Normalized {field: value} for one passenger, or raises BulkError.
+    partial=True (updates) only requires the fields that are present.
+    """
+    if not isinstance(record, dict):
+        raise BulkError("expected an object")
+    out = {}
+    for f in FIELDS:
+        v = record.get(f)
+        if v is None or str(v).strip() == "":
+            if not partial:
+                raise BulkError(f"'{f}' is required")
+            continue
+        out[f] = str(v).strip()
+    if "email" in out and "@" not in out["email"]:
+        raise BulkError("invalid email")
+    return out
+
+
+def _rollup_delta(deltas, row, sign):
+    for dim, key in rollup_keys(row["route"], row["tier"], row["lastBooking"]).items():
+        deltas[(dim, key)] += sign
+
+
+def _existing_by_email(conn, emails):
+    found = {}
+    emails = list(emails)
+    for i in range(0, len(emails), _IN_CHUNK):
+        rows = conn.execute(
+            select(_t.c.id, _t.c.email, _t.c.route, _t.c.tier, _t.c.lastBooking)
+            .where(_t.c.email.in_(emails[i:i + _IN_CHUNK]))
+        ).mappings()
+        found.update((r["email"], dict(r)) for r in rows)
+    return found
+
+
+def taken_emails(conn, emails):
+    """The given emails that already belong to a stored passenger."""
+    return set(_existing_by_email(conn, emails))
+
+
+def write_batch(conn, rows, mode="upsert"):
+    """
+    Writes clean rows in one transaction with executemany INSERT/UPDATE.
+    mode: "create" (existing emails are reported as errors), "upsert"
+    (existing emails are updated). Rollups are adjusted once per batch.
+    Returns (created, updated, [(row index, error)]).
+    """
+    by_email = {}
+    errors = []
+    for i, r in enumerate(rows):
+        if r["email"] in by_email:
+            errors.append((by_email[r["email"]][0], f"duplicate email in batch: {r['email']}"))
+        by_email[r["email"]] = (i, r)  # last one wins
+    existing = _existing_by_email(conn, by_email)
+    to_insert = [r for e, (_, r) in by_email.items() if e not in existing]
+    to_update = []
+    deltas = Counter()
+    for e, (i, r) in by_email.items():
+        old = existing.get(e)
+        if old is None:
+            _rollup_delta(deltas, r, +1)
+        elif mode == "create":
+            errors.append((i, f"email already exists: {e}"))
+        else:
+            to_update.append({**r, "_id": old["id"]})
+            _rollup_delta(deltas, old, -1)
+            _rollup_delta(deltas, r, +1)
+    if to_insert:
+        conn.execute(insert(_t), to_insert)
+    if to_update:
+        conn.execute(
+            update(_t).where(_t.c.id == bindparam("_id"))
+            .values({f: bindparam(f) for f in FIELDS}),
+            to_update,
+        )
+    apply_passenger_rollup(conn, {k: v for k, v in deltas.items() if v})
+    return len(to_insert), len(to_update), errors
+
+
+def update_by_id(conn, rows):
+    """
+    Partial updates [{id, field...}] via executemany, grouped by field set.
+    Several rows for one id are merged in order (later fields win).
+    """
+    merged = {}
+    for r in rows:
+        merged.setdefault(r["id"], {}).update(r)
+    rows = list(merged.values())
+    ids = list(merged)
+    old = {}
+    for i in range(0, len(ids), _IN_CHUNK):
+        for r in conn.execute(
+            select(_t.c.id, _t.c.route, _t.c.tier, _t.c.lastBooking).where(_t.c.id.in_(ids[i:i + _IN_CHUNK]))
+        ).mappings():
+            old[r["id"]] = dict(r)
+    missing = [i for i in ids if i not in old]
+    groups = {}
+    deltas = Counter()
+    for r in rows:
+        if r["id"] not in old:
+            continue
+        fields = tuple(sorted(k for k in r if k != "id"))
+        if not fields:
+            continue
+        groups.setdefault(fields, []).append({**{k: r[k] for k in fields}, "_id": r["id"]})
+        before = old[r["id"]]
+        _rollup_delta(deltas, before, -1)
+        _rollup_delta(deltas, {**before, **{k: r[k] for k in fields}}, +1)
+    for fields, params in groups.items():
+        conn.execute(update(_t).where(_t.c.id == bindparam("_id")).values({f: bindparam(f) for f in fields}), params)
+    apply_passenger_rollup(conn, {k: v for k, v in deltas.items() if v})
+    return sum(len(p) for p in groups.values()), missing
+
+
+# ============================================================
+# 📥 Streaming CSV import
+# ============================================================
+def import_csv(stream, batch_size=IMPORT_BATCH_SIZE, mode="upsert", max_errors=100, db_url=None):
+    """
+    Reads a binary CSV stream row by row and commits every `batch_size`
+    rows in its own transaction, so memory stays at one batch.
+    Column names are matched case-insensitively against FIELDS.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise BulkError("empty CSV")
+    lookup = {c.strip().lower(): c for c in reader.fieldnames}
+    missing = [f for f in FIELDS if f.lower() not in lookup]
+    if missing:
+        raise BulkError(f"missing columns: {', '.join(missing)}")
+    cols = {f: lookup[f.lower()] for f in FIELDS}
+
+    engine = get_engine(db_url)
+    totals = {"rows": 0, "created": 0, "updated": 0, "errors": [], "error_count": 0}
+
+    def flush(batch, line_nos):
+        try:
+            with engine.begin() as conn:
+                created, updated, errs = write_batch(conn, batch, mode)
+        except IntegrityError:
+            # a concurrent writer took an email between the lookup and the INSERT;
+            # the batch was rolled back, and a rerun's lookup now sees that row
+            with engine.begin() as conn:
+                created, updated, errs = write_batch(conn, batch, mode)
+        totals["created"] += created
+        totals["updated"] += updated
+        _record(totals, [(line_nos[i], e) for i, e in errs], max_errors)
+
+    batch, line_nos = [], []
+    for raw in reader:
+        totals["rows"] += 1
+        line = reader.line_num
+        try:
+            batch.append(clean({f: raw.get(c) for f, c in cols.items()}))
+            line_nos.append(line)
+        except BulkError as e:
+            _record(totals, [(line, str(e))], max_errors)
+        if len(batch) >= batch_size:
+            flush(batch, line_nos)
+            batch, line_nos = [], []
+    if batch:
+        flush(batch, line_nos)
+    if totals["created"] or totals["updated"]:
+        notify_passengers_changed()
+    return totals
+
+
+def _record(totals, errs, max_errors):
+    totals["error_count"] += len(errs)
+    room = max_errors - len(totals["errors"])
+    totals["errors"].extend({"line": line, "error": e} for line, e in errs[:max(room, 0)])
+
+
+# ============================================================
+# 📤 Streaming export
+# ============================================================
+def iter_passengers(conds=(), chunk=EXPORT_CHUNK, db_url=None):
+    """Yields passenger dicts in id order, one keyset page per query."""
+    engine = get_engine(db_url)
+    cols = [_t.c.id, *(getattr(_t.c, f) for f in FIELDS)]
+    last = 0
+    while True:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(*cols).where(_t.c.id > last, *conds).order_by(_t.c.id).limit(chunk)
+            ).mappings().all()
+        if not rows:
+            return
+        for r in rows:
+            yield dict(r)
+        last = rows[-1]["id"]
+
+
+def export_csv(rows):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=("id",) + FIELDS)
+    writer.writeheader()
+    n = 0
+    for r in rows:
+        writer.writerow(r)
+        n += 1
+        if n % 1000 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_ndjson(rows):
+    lines = []
+    for r in rows:
+        lines.append(json.dumps(r, separators=(",", ":")))
+        if len(lines) >= 1000:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
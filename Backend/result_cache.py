@@ -0,0 +1,99 @@
+import os, json, zlib, hashlib
+from datetime import datetime
+from sqlalchemy import select, func
+from models import AnalysisResultCache, get_session
+
+# Bump when analyze_seat_demand's output for the same input changes.
+ANALYSIS_VERSION = "8"
+
+MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", 200))
+MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# result fields whose int keys become strings in JSON
+_INT_KEYED_FIELDS = ("monthly_trends", "weekday_trends")
+
+stats = {"hits": 0, "misses": 0}
+
+
+def hash_stream(stream, chunk_size=1 << 20):
+    """sha256 of a seekable file-like object, rewound afterwards."""
+    h = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b""):
+        h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def cache_key(content_hash, **params):
+    """Key = content hash + sorted analysis params + pipeline version."""
+    blob = json.dumps({"content": content_hash, "v": ANALYSIS_VERSION, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def encode(result):
+    return zlib.compress(json.dumps(result, default=float).encode(), 6)
+
+
+def decode(payload):
+    result = json.loads(zlib.decompress(payload))
+    for field in _INT_KEYED_FIELDS:
+        if isinstance(result.get(field), dict):
+            result[field] = {int(k): v for k, v in result[field].items()}
+    return result
+
+
+def get_cached_result(key):
+    try:
+        with get_session() as s:
+            row = s.get(AnalysisResultCache, key)
+            if row is None:
+                stats["misses"] += 1
+                return None
+            row.hits += 1
+            row.last_used_at = datetime.utcnow()
+            payload = row.payload
+            s.commit()
+        stats["hits"] += 1
+        return decode(payload)
+    except Exception as e:
+        print("⚠️ Result cache read error:", e)
+        return None
+
+
+def put_cached_result(key, result):
+    if not result or "error" in result:
+        return
+    try:
+        payload = encode(result)
+        with get_session() as s:
+            row = s.get(AnalysisResultCache, key)
+            if row is None:
+                s.add(AnalysisResultCache(key=key, payload=payload, size_bytes=len(payload)))
+            else:
+                row.payload, row.size_bytes = payload, len(payload)
+                row.last_used_at = datetime.utcnow()
+            s.flush()
+            _evict(s)
+            s.commit()
+    except Exception as e:
+        print("⚠️ Result cache write error:", e)
+
+
+def _evict(s):
+    """Drops least-recently-used rows until both entry and byte limits hold."""
+    t = AnalysisResultCache
+    count, total = s.execute(select(func.count(t.key), func.coalesce(func.sum(t.size_bytes), 0))).one()
+    if count <= MAX_ENTRIES and total <= MAX_BYTES:
+        return
+    for key, size in s.execute(select(t.key, t.size_bytes).order_by(t.last_used_at.asc())).all():
+        if count <= MAX_ENTRIES and total <= MAX_BYTES:
+            break
+        s.delete(s.get(t, key))
+        count, total = count - 1, total - size
+
+
+def clear():
+    with get_session() as s:
+        s.query(AnalysisResultCache).delete()
+        s.commit()
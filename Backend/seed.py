@@ -1,6 +1,23 @@
-from models import Passenger, get_session
+"""
+Seeds passengers.db.
+
+    python seed.py                      # the six demo passengers
+    python seed.py --scale 10 --reset   # 1M passengers + 100k history rows
+    python seed.py --passengers 20m --history 5m --seed 7 --db sqlite:////tmp/load.db
+
+Synthetic rows are generated with numpy in chunks and written with Core
+executemany, so tens of millions of rows fit in bounded memory. The same
+--seed / --as-of / sizes always produce the same database.
+"""
+import sys, time, argparse, random
 from datetime import date, timedelta
-import random
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, func, insert, select
+
+from models import (
+    SQLITE_PRAGMAS, Passenger, SeatDemandHistory, get_engine, get_session, init_db, rebuild_passenger_rollups,
+)
 
 names = [
     ("Asha Verma", "asha.verma@example.com"),
@@ -11,19 +28,217 @@ names = [
     ("Vikram Joshi", "vikram.joshi@example.com"),
 ]
 
-routes = ["DEL->BLR", "BLR->BOM", "BOM->DEL", "DEL->HYD", "HYD->MAA"]
-tiers = ["REGULAR", "SILVER", "GOLD", "PLATINUM"]
-
-s = get_session()
-for n, e in names:
-    s.merge(
-        Passenger(
-            name=n,
-            email=e,
-            route=random.choice(routes),
-            tier=random.choices(tiers, weights=[50,25,15,10])[0],
-            lastBooking=(date.today() - timedelta(days=random.randint(1,120))).isoformat(),
-        )
-    )
-s.commit()
-print("✅ Demo passengers seeded.")
+ROUTES = ["DEL->BLR", "BLR->BOM", "BOM->DEL", "DEL->HYD", "HYD->MAA"]
+TIERS = ["REGULAR", "SILVER", "GOLD", "PLATINUM"]
+TIER_WEIGHTS = [50, 25, 15, 10]
+
+# per unit of --scale
+PASSENGERS_PER_SCALE = 100_000
+HISTORY_PER_SCALE = 10_000
+CHUNK = 100_000
+DEFAULT_AS_OF = "2025-01-01"
+
+FIRST_NAMES = np.array(["Asha", "Rohit", "Meera", "Kabir", "Ananya", "Vikram", "Priya", "Arjun", "Neha",
+                        "Karan", "Isha", "Rahul", "Sneha", "Aditya", "Pooja", "Siddharth", "Divya", "Nikhil"])
+LAST_NAMES = np.array(["Verma", "Sen", "Iyer", "Khan", "Rao", "Joshi", "Sharma", "Patel", "Nair",
+                       "Gupta", "Reddy", "Mehta", "Das", "Kapoor", "Singh", "Menon", "Bose", "Pillai"])
+# busier trunk routes first; roughly Zipf-shaped like real route networks
+ROUTE_WEIGHTS = [1 / (i + 1) for i in range(len(ROUTES))]
+HISTORY_SOURCES = ["Upload", "Kaggle"]
+HISTORY_TARGETS = ["num_passengers", "booking_complete", "passengers"]
+
+
+def seed_demo():
+    with get_session() as s:
+        for n, e in names:
+            s.merge(
+                Passenger(
+                    name=n,
+                    email=e,
+                    route=random.choice(ROUTES),
+                    tier=random.choices(TIERS, weights=TIER_WEIGHTS)[0],
+                    lastBooking=(date.today() - timedelta(days=random.randint(1,120))).isoformat(),
+                )
+            )
+        s.commit()
+    print("✅ Demo passengers seeded.")
+
+
+# ============================================================
+# 🧪 Vectorized synthetic rows (chunk i is a pure function of seed + i)
+# ============================================================
+def _p(weights):
+    w = np.asarray(weights, dtype=float)
+    return w / w.sum()
+
+
+MAX_BOOKING_AGE_DAYS = 730
+
+# every (first, last) pair formatted once; rows just index into these
+_FULL_NAMES = np.array([f"{f} {l}" for f in FIRST_NAMES for l in LAST_NAMES], dtype=object)
+_EMAIL_PREFIXES = np.array([f"{f.lower()}.{l.lower()}." for f in FIRST_NAMES for l in LAST_NAMES], dtype=object)
+
+
+def _day_table(as_of, max_days):
+    """ISO strings for as_of - 0 .. max_days days."""
+    days = pd.Timestamp(as_of) - pd.to_timedelta(np.arange(max_days + 1), unit="D")
+    return np.asarray(days.strftime("%Y-%m-%d"), dtype=object)
+
+
+def passenger_chunk(start, n, seed, as_of):
+    rng = np.random.default_rng([seed, start])
+    idx = np.arange(start, start + n)
+    pair = rng.integers(0, len(_FULL_NAMES), n)
+    # recency skewed like real booking activity: most passengers flew recently
+    days = np.minimum(rng.exponential(60, n).astype(np.int64), MAX_BOOKING_AGE_DAYS)
+    return pd.DataFrame({
+        "name": _FULL_NAMES[pair],
+        "email": _EMAIL_PREFIXES[pair] + idx.astype(str).astype(object) + "@example.com",
+        "route": np.array(ROUTES, dtype=object)[rng.choice(len(ROUTES), n, p=_p(ROUTE_WEIGHTS))],
+        "tier": np.array(TIERS, dtype=object)[rng.choice(len(TIERS), n, p=_p(TIER_WEIGHTS))],
+        "lastBooking": _day_table(as_of, MAX_BOOKING_AGE_DAYS)[days],
+    })
+
+
+def history_chunk(start, n, total, seed, as_of):
+    rng = np.random.default_rng([seed, 1_000_000_007, start])
+    # `total` analyses spread evenly over the year before as_of, oldest first
+    step = 365 * 24 * 3600 / total
+    offsets = (start + np.arange(n)) * step + rng.uniform(0, step, n)
+    created = pd.Timestamp(as_of) - pd.Timedelta(days=365) + pd.to_timedelta(offsets.round(), unit="s")
+    month = created.month.to_numpy()
+    season = 1 + 0.25 * np.sin(2 * np.pi * (month - 1) / 12)
+    predicted = np.round(rng.normal(150, 30, n) * season, 2)
+    festive = np.round(predicted * rng.uniform(1.05, 1.4, n), 2)
+    source = np.array(HISTORY_SOURCES)[rng.choice(2, n, p=[0.7, 0.3])]
+    return pd.DataFrame({
+        "source": source,
+        "dataset_name": np.where(source == "Kaggle", "Kaggle Dataset",
+                                 pd.Series((start + np.arange(n)) % 500).map("bookings_{}.csv".format)),
+        "predicted_demand": predicted,
+        "festive_avg": festive,
+        "message": "Synthetic seed analysis",
+        "records_analyzed": rng.integers(1_000, 2_000_000, n),
+        "target_column": np.array(HISTORY_TARGETS)[rng.integers(0, len(HISTORY_TARGETS), n)],
+        "created_at": created.to_pydatetime(),
+    })
+
+
+# ============================================================
+# 🚚 Bulk load
+# ============================================================
+def _records(df):
+    """DataFrame -> list of dicts with plain Python scalars for the DB-API."""
+    cols = list(df.columns)
+    return [dict(zip(cols, row)) for row in zip(*(df[c].tolist() for c in cols))]
+
+
+def _bulk_insert(engine, table, total, make_chunk, label, defer_indexes=False):
+    """
+    Inserts `total` rows chunk by chunk, one transaction per chunk, on a
+    dedicated connection. On SQLite that connection runs with
+    synchronous=OFF for the load and gets the normal setting back before
+    it returns to the pool. defer_indexes drops the table's secondary
+    indexes for the load and rebuilds them once at the end (much cheaper
+    than per-row upkeep).
+    """
+    t0 = time.perf_counter()
+    indexes = list(table.indexes) if defer_indexes else []
+    sqlite = engine.dialect.name == "sqlite"
+    conn = engine.connect()
+    try:
+        if sqlite:
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")  # bulk load; re-run to recover
+            conn.commit()
+        with conn.begin():
+            for ix in indexes:
+                ix.drop(conn, checkfirst=True)
+        try:
+            done = 0
+            for start in range(0, total, CHUNK):
+                df = make_chunk(start, min(CHUNK, total - start))
+                with conn.begin():
+                    conn.execute(insert(table), _records(df))
+                done += len(df)
+                rate = done / max(time.perf_counter() - t0, 1e-9)
+                print(f"   {label}: {done:,}/{total:,} ({rate:,.0f} rows/s)", flush=True)
+        finally:
+            if conn.in_transaction():
+                conn.rollback()
+            with conn.begin():
+                for ix in indexes:
+                    ix.create(conn, checkfirst=True)
+    finally:
+        try:
+            if conn.in_transaction():
+                conn.rollback()
+            if sqlite:
+                conn.exec_driver_sql(f"PRAGMA synchronous={SQLITE_PRAGMAS['synchronous']}")
+                conn.commit()
+        except Exception:
+            conn.invalidate()  # never hand an unsafe connection back to the pool
+        conn.close()
+    return time.perf_counter() - t0
+
+
+def seed_synthetic(passengers, history, seed=42, as_of=DEFAULT_AS_OF, reset=False, db_url=None):
+    """Bulk-loads synthetic passengers + history rows and rebuilds the rollups."""
+    init_db(db_url)
+    engine = get_engine(db_url)
+    p, h = Passenger.__table__, SeatDemandHistory.__table__
+    with engine.begin() as conn:
+        if reset:
+            conn.execute(delete(p))
+            conn.execute(delete(h))
+        elif passengers and conn.execute(select(func.count()).select_from(p)).scalar():
+            raise SystemExit("❌ passengers table is not empty; pass --reset for a reproducible load")
+        history_empty = not conn.execute(select(func.count()).select_from(h)).scalar()
+
+    print(f"🌱 Seeding {passengers:,} passengers + {history:,} history rows (seed={seed}, as_of={as_of})")
+    timings = {}
+    if passengers:
+        timings["passengers"] = _bulk_insert(
+            engine, p, passengers, lambda s, n: passenger_chunk(s, n, seed, as_of), "passengers",
+            defer_indexes=True)
+    if history:
+        timings["history"] = _bulk_insert(
+            engine, h, history, lambda s, n: history_chunk(s, n, history, seed, as_of), "history",
+            defer_indexes=history_empty)
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        rebuild_passenger_rollups(conn)
+    timings["rollups"] = time.perf_counter() - t0
+    print("✅ Seeded in " + ", ".join(f"{k}={v:.1f}s" for k, v in timings.items()))
+    return timings
+
+
+def _parse_count(token):
+    token = str(token).strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(token[-1:])
+    return int(float(token[:-1]) * mult) if mult else int(token)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, help=f"1.0 = {PASSENGERS_PER_SCALE:,} passengers "
+                                                    f"+ {HISTORY_PER_SCALE:,} history rows")
+    parser.add_argument("--passengers", help="passenger rows, e.g. 500k or 20m (overrides --scale)")
+    parser.add_argument("--history", help="seat-demand history rows (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--as-of", default=DEFAULT_AS_OF, help="anchor date for generated dates")
+    parser.add_argument("--reset", action="store_true", help="delete existing passengers + history first")
+    parser.add_argument("--db", help="database URL (default: DATABASE_URL or sqlite:///passengers.db)")
+    args = parser.parse_args(argv)
+
+    if args.scale is None and args.passengers is None and args.history is None:
+        seed_demo()
+        return 0
+    scale = args.scale or 0
+    passengers = _parse_count(args.passengers) if args.passengers else int(scale * PASSENGERS_PER_SCALE)
+    history = _parse_count(args.history) if args.history else int(scale * HISTORY_PER_SCALE)
+    seed_synthetic(passengers, history, args.seed, args.as_of, args.reset, args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+import threading
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+import result_cache
+from models import AnalysisState, get_session
+
+DEFAULT_TENANT = "default"
+
+# tenant -> (version, result): this process's decoded copy, reused until the version moves
+_LOCAL = {}
+_LOCK = threading.Lock()
+_PUBLISH_HOOKS = []
+
+
+def on_publish(fn):
+    """Registers fn(tenant, version) to run in this process after each publish."""
+    _PUBLISH_HOOKS.append(fn)
+    return fn
+
+
+def version(tenant=DEFAULT_TENANT):
+    """Published version for tenant (0 if none). A single primary-key lookup."""
+    with get_session() as s:
+        return s.execute(select(AnalysisState.version).where(AnalysisState.tenant == tenant)).scalar() or 0
+
+
+def publish(tenant, result, source=None, dataset_name=None, content_hash=None):
+    """
+    Stores `result` as tenant's latest analysis and bumps its version.
+    Returns the new version (None for error results, which aren't published).
+    """
+    if not result or "error" in result:
+        return None
+    t = AnalysisState
+    fields = {
+        "source": source, "dataset_name": dataset_name, "content_hash": content_hash,
+        "payload": result_cache.encode(result), "updated_at": datetime.utcnow(),
+    }
+    bump = update(t).where(t.tenant == tenant).values(version=t.version + 1, **fields)
+    with get_session() as s:
+        if not s.execute(bump).rowcount:
+            s.add(t(tenant=tenant, version=1, **fields))
+            try:
+                s.flush()
+            except IntegrityError:  # another worker published first
+                s.rollback()
+                s.execute(bump)
+        new_version = s.execute(select(t.version).where(t.tenant == tenant)).scalar()
+        s.commit()
+    with _LOCK:
+        _LOCAL[tenant] = (new_version, result)
+    for fn in _PUBLISH_HOOKS:
+        try:
+            fn(tenant, new_version)
+        except Exception as e:
+            print("⚠️ Publish hook failed:", e)
+    return new_version
+
+
+def latest(tenant=DEFAULT_TENANT):
+    """
+    (version, result) of tenant's latest analysis, or (0, None). Only the
+    version is read when this process already holds that version.
+    """
+    with get_session() as s:
+        v = s.execute(select(AnalysisState.version).where(AnalysisState.tenant == tenant)).scalar() or 0
+        with _LOCK:
+            cached = _LOCAL.get(tenant)
+        if cached and cached[0] == v:
+            return cached
+        if not v:
+            return 0, None
+        row = s.execute(
+            select(AnalysisState.version, AnalysisState.payload).where(AnalysisState.tenant == tenant)
+        ).one()
+    entry = (row.version, result_cache.decode(row.payload))
+    with _LOCK:
+        _LOCAL[tenant] = entry
+    return entry
+
+
+def info(tenant=DEFAULT_TENANT):
+    """Metadata of tenant's latest analysis without decoding the payload."""
+    t = AnalysisState
+    with get_session() as s:
+        row = s.execute(
+            select(t.version, t.source, t.dataset_name, t.content_hash, t.updated_at).where(t.tenant == tenant)
+        ).first()
+    if row is None:
+        return None
+    return {
+        "tenant": tenant,
+        "version": row.version,
+        "source": row.source,
+        "dataset_name": row.dataset_name,
+        "content_hash": row.content_hash,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
@@ -0,0 +1,67 @@
+"""
+Shared fixtures. Every test run gets its own SQLite file and cache dir,
+so nothing touches passengers.db or Backend/.cache.
+"""
+import os, sys, tempfile
+
+_TMP = tempfile.mkdtemp(prefix="flydash-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["FLYDASH_CACHE_DIR"] = os.path.join(_TMP, "cache")
+os.environ["FORECAST_SCHEDULER"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import delete, select
+
+from models import Base, PassengerRollup, init_db, rebuild_passenger_rollups
+
+
+@pytest.fixture
+def engine():
+    """The test DB, emptied after each test."""
+    eng = init_db()
+    yield eng
+    with eng.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+
+
+@pytest.fixture
+def client(engine):
+    import app
+    return app.app.test_client()
+
+
+def rollups(eng):
+    t = PassengerRollup.__table__
+    with eng.connect() as conn:
+        return {(d, k): n for d, k, n in conn.execute(select(t.c.dim, t.c.key, t.c.count))}
+
+
+@pytest.fixture
+def assert_rollups_consistent(engine):
+    """Asserts the incrementally maintained rollups match a from-scratch rebuild."""
+    def check():
+        maintained = rollups(engine)
+        with engine.begin() as conn:
+            rebuild_passenger_rollups(conn)
+        assert maintained == rollups(engine)
+        return maintained
+    return check
+
+
+@pytest.fixture
+def walk_pages(client):
+    """walk_pages(url, **params) follows next_cursor to the end and returns every page's items."""
+    def walk(url, **params):
+        pages, cursor = [], None
+        while True:
+            q = dict(params, **({"cursor": cursor} if cursor else {}))
+            resp = client.get(url, query_string=q)
+            assert resp.status_code == 200, resp.get_json()
+            body = resp.get_json()
+            pages.append(body["items"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return pages
+    return walk
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import dataset_cache
+
+
+@pytest.fixture
+def kaggle_csv(tmp_path, monkeypatch):
+    """A small Kaggle-shaped CSV as the local source, with a private columnar cache dir."""
+    rng = np.random.default_rng(0)
+    n = 400
+    pd.DataFrame({
+        "Booking Date": pd.date_range("2024-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        "Route": rng.choice(["DEL-BLR", "BOM-DEL", "HYD-MAA"], n),
+        "num_passengers": rng.integers(50, 400, n),
+        "fare": rng.uniform(2500, 12000, n).round(2),
+    }).to_csv(tmp_path / "bookings.csv", index=False)
+    monkeypatch.setenv("KAGGLE_DATA_PATH", str(tmp_path / "bookings.csv"))
+    monkeypatch.setattr(dataset_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    dataset_cache.clear_memory()
+    yield tmp_path / "bookings.csv"
+    dataset_cache.clear_memory()
+
+
+def test_frame_is_shared_and_tagged(kaggle_csv):
+    built = dataset_cache.load_kaggle_frame(allow_download=False)
+    assert dataset_cache.load_kaggle_frame(allow_download=False) is built
+    assert built.attrs["fingerprint"] == dataset_cache.dataset_fingerprint() == dataset_cache.source_fingerprint()
+
+
+def test_mapped_frame_survives_analysis_unchanged(kaggle_csv):
+    dataset_cache.load_kaggle_frame(allow_download=False)
+    dataset_cache.clear_memory()
+    mapped = dataset_cache.load_kaggle_frame(allow_download=False)  # from the Feather file this time
+    if dataset_cache.feather is not None:
+        assert not mapped["num_passengers"].to_numpy().flags.writeable  # a view of the map, not a copy
+    before = mapped.copy()
+    result = analysis.analyze_seat_demand(mapped, dataset_id=mapped.attrs["fingerprint"])
+    assert "error" not in result and result["target_column"] == "num_passengers"
+    pd.testing.assert_frame_equal(mapped, before)
@@ -0,0 +1,16 @@
+import pytest
+
+import app as app_module
+
+
+@pytest.mark.parametrize("window", [-1, app_module.FLIGHTOPS_WINDOW_MAX + 1, 1_000_000_000])
+def test_window_outside_range_is_rejected(client, window):
+    resp = client.get("/api/flightops/status", query_string={"window": window})
+    assert resp.status_code == 400
+
+
+def test_limit_is_clamped(client):
+    flights = client.get("/api/flightops/status?window=1440&limit=0").get_json()["flights"]
+    assert len(flights) == 1
+    flights = client.get("/api/flightops/status?window=1440&limit=99999999").get_json()["flights"]
+    assert 1 < len(flights) <= app_module.FLIGHTOPS_LIMIT_MAX
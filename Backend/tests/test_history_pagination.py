@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from models import SeatDemandHistory
+
+
+@pytest.fixture
+def history(engine):
+    t0 = datetime(2025, 1, 1, 12, 0, 0)
+    rows = [{"source": "Upload" if i % 2 else "Kaggle", "dataset_name": f"d{i}", "predicted_demand": float(i),
+             "created_at": t0 + timedelta(minutes=i // 3)}  # groups of 3 share a timestamp
+            for i in range(14)]
+    with engine.begin() as conn:
+        conn.execute(insert(SeatDemandHistory), rows)
+    return rows
+
+
+def test_history_pages_newest_first_across_ties(history, walk_pages):
+    pages = walk_pages("/api/seat-demand/history", limit=4)
+    items = [h for page in pages for h in page]
+    assert len(items) == 14 and len({h["id"] for h in items}) == 14
+    keys = [(h["created_at"], h["id"]) for h in items]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_history_source_filter_and_bad_cursor(client, history, walk_pages):
+    items = [h for page in walk_pages("/api/seat-demand/history", limit=2, source="Upload") for h in page]
+    assert len(items) == 7 and {h["source"] for h in items} == {"Upload"}
+    assert client.get("/api/seat-demand/history?cursor=xyz").status_code == 400
+
+
+def test_history_etag_revalidates(client, engine, history):
+    first = client.get("/api/seat-demand/history")
+    etag = first.headers["ETag"]
+    assert client.get("/api/seat-demand/history", headers={"If-None-Match": etag}).status_code == 304
+    with engine.begin() as conn:
+        conn.execute(insert(SeatDemandHistory), [{"source": "Upload", "created_at": datetime(2025, 2, 1)}])
+    again = client.get("/api/seat-demand/history", headers={"If-None-Match": etag})
+    assert again.status_code == 200 and again.headers["ETag"] != etag
+
+
+def test_history_detail(client, history):
+    hid = client.get("/api/seat-demand/history?limit=1").get_json()["items"][0]["id"]
+    resp = client.get(f"/api/seat-demand/history/{hid}")
+    assert resp.status_code == 200 and resp.get_json()["id"] == hid
+    assert client.get(f"/api/seat-demand/history/{hid}", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+    assert client.get("/api/seat-demand/history/999999").status_code == 404
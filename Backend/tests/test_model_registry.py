@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+import model_registry
+
+
+@pytest.fixture
+def registry_dir(tmp_path, monkeypatch):
+    d = tmp_path / "models"
+    d.mkdir()
+    monkeypatch.setattr(model_registry, "MODEL_DIR", str(d))
+    # a file a traversal key would hit: <MODEL_DIR>/../victim.txt and .json
+    for ext in ("txt", "json"):
+        (tmp_path / f"victim.{ext}").write_text("{}")
+    return tmp_path
+
+
+@pytest.mark.parametrize("key", ["../victim", "/etc/passwd", "ABCDEF0123456789", "abc", "0" * 65])
+def test_non_hex_keys_are_refused(registry_dir, key):
+    assert model_registry.get_model(key) is None
+    assert model_registry.evict(key) == 0
+    assert os.path.exists(registry_dir / "victim.txt")
+
+
+def test_routes_reject_bad_keys(client, registry_dir):
+    assert client.get("/api/forecast/grid", query_string={"model": "../victim"}).status_code == 404
+    assert client.delete("/api/models/..%2Fvictim").status_code == 404
+    assert client.delete("/api/models/not-a-key").status_code == 404
+    assert os.path.exists(registry_dir / "victim.json")
@@ -0,0 +1,157 @@
+import io
+
+import pytest
+from sqlalchemy import select
+
+import passenger_bulk
+from models import Passenger, get_session
+
+
+def _row(email, route="DEL->BLR", tier="GOLD", day="2025-01-05", name="P"):
+    return {"name": name, "email": email, "route": route, "tier": tier, "lastBooking": day}
+
+
+def _write(engine, rows, mode="upsert"):
+    with engine.begin() as conn:
+        return passenger_bulk.write_batch(conn, rows, mode)
+
+
+def _routes(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Passenger.email, Passenger.route)).all())
+
+
+def test_write_batch_creates(engine, assert_rollups_consistent):
+    assert _write(engine, [_row("a@x.com"), _row("b@x.com", route="BOM->DEL")]) == (2, 0, [])
+    r = assert_rollups_consistent()
+    assert r[("route", "DEL->BLR")] == 1 and r[("route", "BOM->DEL")] == 1
+
+
+def test_upsert_over_existing_email_moves_route(engine, assert_rollups_consistent):
+    _write(engine, [_row("a@x.com"), _row("b@x.com")])
+    created, updated, errors = _write(engine, [_row("a@x.com", route="HYD->MAA", tier="SILVER", day="2025-03-01"),
+                                               _row("c@x.com")])
+    assert (created, updated, errors) == (1, 1, [])
+    assert _routes(engine)["a@x.com"] == "HYD->MAA"
+    r = assert_rollups_consistent()
+    assert r[("route", "DEL->BLR")] == 2
+    assert r[("route", "HYD->MAA")] == 1
+    assert r[("tier", "SILVER")] == 1
+
+
+def test_create_mode_reports_existing_emails(engine, assert_rollups_consistent):
+    _write(engine, [_row("a@x.com")])
+    created, updated, errors = _write(engine, [_row("a@x.com", route="HYD->MAA"), _row("b@x.com")], mode="create")
+    assert (created, updated) == (1, 0)
+    assert errors == [(0, "email already exists: a@x.com")]
+    assert _routes(engine)["a@x.com"] == "DEL->BLR"
+    assert_rollups_consistent()
+
+
+@pytest.mark.parametrize("existing", [False, True])
+def test_duplicates_within_a_batch_keep_the_last(engine, assert_rollups_consistent, existing):
+    if existing:
+        _write(engine, [_row("a@x.com", route="BLR->BOM")])
+    created, updated, errors = _write(engine, [_row("a@x.com", route="DEL->BLR"), _row("b@x.com"),
+                                               _row("a@x.com", route="HYD->MAA")])
+    assert errors == [(0, "duplicate email in batch: a@x.com")]
+    assert (created, updated) == ((1, 1) if existing else (2, 0))
+    assert _routes(engine) == {"a@x.com": "HYD->MAA", "b@x.com": "DEL->BLR"}
+    r = assert_rollups_consistent()
+    assert ("route", "BLR->BOM") not in r
+    assert r[("route", "HYD->MAA")] == 1
+
+
+def test_update_by_id_partial_and_missing(engine, assert_rollups_consistent):
+    _write(engine, [_row("a@x.com"), _row("b@x.com")])
+    ids = dict((e, i) for i, e in engine.connect().execute(select(Passenger.id, Passenger.email)).all())
+    with engine.begin() as conn:
+        updated, missing = passenger_bulk.update_by_id(conn, [
+            {"id": ids["a@x.com"], "route": "HYD->MAA"},
+            {"id": ids["b@x.com"], "tier": "PLATINUM", "lastBooking": "2025-04-01"},
+            {"id": 999_999, "route": "BOM->DEL"},
+        ])
+    assert (updated, missing) == (2, [999_999])
+    r = assert_rollups_consistent()
+    assert r[("route", "HYD->MAA")] == 1
+    assert r[("tier", "PLATINUM")] == 1
+    assert r[("day", "2025-04-01")] == 1
+
+
+def test_update_by_id_same_id_twice(engine, assert_rollups_consistent):
+    _write(engine, [_row("a@x.com")])
+    pid = engine.connect().execute(select(Passenger.id)).scalar()
+    with engine.begin() as conn:
+        passenger_bulk.update_by_id(conn, [{"id": pid, "route": "BLR->BOM"},
+                                           {"id": pid, "route": "HYD->MAA", "tier": "SILVER"}])
+    assert _routes(engine)["a@x.com"] == "HYD->MAA"
+    assert assert_rollups_consistent() == {("route", "HYD->MAA"): 1, ("tier", "SILVER"): 1, ("day", "2025-01-05"): 1}
+
+
+def test_mixed_orm_and_bulk_writes_match_rebuild(engine, assert_rollups_consistent):
+    _write(engine, [_row(f"p{i}@x.com", route=["DEL->BLR", "BOM->DEL", "HYD->MAA"][i % 3],
+                         day=f"2025-01-{1 + i % 5:02d}") for i in range(30)])
+    with get_session() as s:
+        p = s.query(Passenger).filter_by(email="p1@x.com").one()
+        p.route = "BLR->BOM"
+        s.delete(s.query(Passenger).filter_by(email="p2@x.com").one())
+        s.add(Passenger(name="O", email="orm@x.com", route="DEL->BLR", tier="REGULAR", lastBooking="2025-01-09"))
+        s.commit()
+    _write(engine, [_row("p1@x.com", route="HYD->MAA"), _row("orm@x.com", tier="GOLD"), _row("new@x.com")])
+    with get_session() as s:
+        p = s.query(Passenger).filter_by(email="new@x.com").one()
+        pid = p.id
+        p.lastBooking = "2025-02-02"
+        s.commit()
+    with engine.begin() as conn:
+        passenger_bulk.update_by_id(conn, [{"id": pid, "route": "BOM->DEL"}])
+    r = assert_rollups_consistent()
+    assert sum(n for (dim, _), n in r.items() if dim == "route") == 31
+
+
+def test_import_csv_batches_and_line_numbers(engine, assert_rollups_consistent):
+    csv = ("Name,Email,Route,Tier,LastBooking\n"
+           "A,a@x.com,DEL->BLR,GOLD,2025-01-01\n"
+           "B,not-an-email,DEL->BLR,GOLD,2025-01-01\n"
+           "C,c@x.com,BOM->DEL,SILVER,2025-01-02\n"
+           "A2,a@x.com,HYD->MAA,GOLD,2025-01-03\n")
+    totals = passenger_bulk.import_csv(io.BytesIO(csv.encode()), batch_size=2)
+    assert (totals["rows"], totals["created"], totals["updated"]) == (4, 2, 1)
+    assert totals["errors"] == [{"line": 3, "error": "invalid email"}]
+    assert _routes(engine)["a@x.com"] == "HYD->MAA"
+    assert_rollups_consistent()
+
+
+@pytest.fixture
+def stale_precheck(monkeypatch):
+    """
+    stale_precheck() makes the next email lookup miss everything, as if a
+    concurrent writer inserted right after it.
+    """
+    real = passenger_bulk._existing_by_email
+    calls = []
+
+    def lookup(conn, emails):
+        calls.append(emails)
+        return {} if len(calls) == 1 else real(conn, emails)
+    return lambda: monkeypatch.setattr(passenger_bulk, "_existing_by_email", lookup)
+
+
+def test_post_batch_conflict_after_precheck_is_409(client, engine, assert_rollups_consistent, stale_precheck):
+    _write(engine, [_row("a@x.com")])
+    stale_precheck()
+    resp = client.post("/api/passengers", json=[_row("b@x.com"), _row("a@x.com", route="HYD->MAA")])
+    assert resp.status_code == 409
+    assert resp.get_json()["errors"] == [{"index": 1, "error": "email already exists: a@x.com"}]
+    assert _routes(engine) == {"a@x.com": "DEL->BLR"}  # b@x.com rolled back too
+    assert_rollups_consistent()
+
+
+def test_import_retries_a_batch_that_lost_an_insert_race(engine, assert_rollups_consistent, stale_precheck):
+    _write(engine, [_row("a@x.com")])
+    stale_precheck()
+    csv_bytes = b"name,email,route,tier,lastBooking\nA,a@x.com,HYD->MAA,GOLD,2025-01-01\nB,b@x.com,DEL->BLR,GOLD,2025-01-02\n"
+    totals = passenger_bulk.import_csv(io.BytesIO(csv_bytes), mode="upsert")
+    assert (totals["created"], totals["updated"], totals["errors"]) == (1, 1, [])
+    assert _routes(engine) == {"a@x.com": "HYD->MAA", "b@x.com": "DEL->BLR"}
+    assert_rollups_consistent()
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import insert
+
+import app as app_module
+from models import Passenger
+
+
+@pytest.fixture
+def passengers(engine):
+    routes = ["DEL->BLR", "BOM->DEL", "HYD->MAA"]
+    rows = [{"name": f"P{i}", "email": f"p{i}@x.com", "route": routes[i % 3], "tier": "GOLD",
+             "lastBooking": f"2025-01-{1 + (i * 7) % 4:02d}"}  # only 4 distinct days: lots of ties
+            for i in range(25)]
+    with engine.begin() as conn:
+        conn.execute(insert(Passenger), rows)
+    return rows
+
+
+def test_passengers_pages_cover_every_row_once(passengers, walk_pages):
+    pages = walk_pages("/api/passengers", limit=7)
+    assert [len(p) for p in pages] == [7, 7, 7, 4]
+    ids = [p["id"] for page in pages for p in page]
+    assert ids == sorted(ids) and len(set(ids)) == 25
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_passengers_sort_by_last_booking_with_ties(passengers, order, walk_pages):
+    items = [p for page in walk_pages("/api/passengers", limit=4, sort="lastBooking", order=order) for p in page]
+    keys = [(p["lastBooking"], p["id"]) for p in items]
+    assert keys == sorted(keys, reverse=order == "desc")
+    assert len(set(keys)) == 25
+
+
+def test_passengers_cursor_keeps_filters(client, passengers, walk_pages):
+    items = [p for page in walk_pages("/api/passengers", limit=3, route="BOM->DEL") for p in page]
+    assert {p["route"] for p in items} == {"BOM->DEL"}
+    assert len(items) == sum(r["route"] == "BOM->DEL" for r in passengers)
+    first = client.get("/api/passengers", query_string={"q": "p1", "include_total": "1", "limit": 2}).get_json()
+    assert first["total"] == 11  # p1, p10..p19
+    assert len(first["items"]) == 2 and first["next_cursor"]
+
+
+def test_passengers_rows_added_behind_the_cursor_are_not_repeated(client, engine, passengers, walk_pages):
+    first = client.get("/api/passengers", query_string={"limit": 10, "sort": "lastBooking"}).get_json()
+    with engine.begin() as conn:
+        conn.execute(insert(Passenger), [{"name": "Early", "email": "early@x.com", "route": "DEL->BLR",
+                                          "tier": "GOLD", "lastBooking": "2024-12-31"}])
+    rest = [p for page in walk_pages("/api/passengers", limit=10, sort="lastBooking",
+                                 cursor=first["next_cursor"]) for p in page]
+    seen = [p["id"] for p in first["items"]] + [p["id"] for p in rest]
+    assert len(seen) == len(set(seen)) == 25
+
+
+def test_passengers_bad_params(client, passengers):
+    assert client.get("/api/passengers?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/passengers?sort=name").status_code == 400
+    assert client.get("/api/passengers?limit=abc").status_code == 400
+    assert len(client.get("/api/passengers?limit=0").get_json()["items"]) == 1
+
+
+def test_passengers_cursor_from_another_sort_is_rejected(client, passengers):
+    by_id = client.get("/api/passengers?limit=5").get_json()["next_cursor"]
+    by_date = client.get("/api/passengers?limit=5&sort=lastBooking").get_json()["next_cursor"]
+    assert client.get("/api/passengers", query_string={"sort": "lastBooking", "cursor": by_id}).status_code == 400
+    assert client.get("/api/passengers", query_string={"cursor": by_date}).status_code == 400
+    bogus = app_module._encode_cursor({"a": 1}, [2])
+    assert client.get("/api/passengers", query_string={"sort": "lastBooking", "cursor": bogus}).status_code == 400
+
+
+def test_passengers_search_treats_wildcards_literally(client, engine, passengers):
+    assert client.get("/api/passengers?q=_&include_total=1").get_json()["total"] == 0
+    assert client.get("/api/passengers?q=%25&include_total=1").get_json()["total"] == 0
+    with engine.begin() as conn:
+        conn.execute(insert(Passenger), [{"name": "Ann_100%", "email": "ann@x.com", "route": "DEL->BLR",
+                                          "tier": "GOLD", "lastBooking": "2025-01-01"}])
+    items = client.get("/api/passengers?q=_100%25").get_json()["items"]
+    assert [p["name"] for p in items] == ["Ann_100%"]
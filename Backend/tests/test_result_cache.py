@@ -0,0 +1,114 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis
+import result_cache
+
+
+@pytest.fixture
+def stub():
+    """A stub analyzer (no training); stub.calls records every real run."""
+    def stub_analyzer(data, deterministic=True, dataset_id=None):
+        stub_analyzer.calls.append(dataset_id)
+        if data == "bad":
+            return {"error": "boom"}
+        return {"predicted_demand": 1.0, "monthly_trends": {1: 2.0}, "dataset_id": dataset_id}
+
+    stub_analyzer.calls = []
+    return stub_analyzer
+
+
+def test_key_depends_on_content_params_and_version(monkeypatch):
+    key = result_cache.cache_key("abc", deterministic=True, seed=42)
+    assert key == result_cache.cache_key("abc", seed=42, deterministic=True)
+    assert key != result_cache.cache_key("abd", deterministic=True, seed=42)
+    assert key != result_cache.cache_key("abc", deterministic=True, seed=7)
+    monkeypatch.setattr(result_cache, "ANALYSIS_VERSION", result_cache.ANALYSIS_VERSION + "-next")
+    assert key != result_cache.cache_key("abc", deterministic=True, seed=42)
+
+
+def test_roundtrip_restores_int_keys(engine):
+    result_cache.put_cached_result("k", {"monthly_trends": {1: 5.0, 12: 7.5}, "x": 1})
+    assert result_cache.get_cached_result("k") == {"monthly_trends": {1: 5.0, 12: 7.5}, "x": 1}
+    assert result_cache.get_cached_result("missing") is None
+
+
+def test_error_results_are_not_cached(engine):
+    result_cache.put_cached_result("k", {"error": "bad file"})
+    assert result_cache.get_cached_result("k") is None
+
+
+def test_lru_eviction_keeps_recently_used(engine, monkeypatch):
+    monkeypatch.setattr(result_cache, "MAX_ENTRIES", 2)
+    result_cache.put_cached_result("a", {"v": "a"})
+    result_cache.put_cached_result("b", {"v": "b"})
+    assert result_cache.get_cached_result("a") is not None  # a is now the most recently used
+    result_cache.put_cached_result("c", {"v": "c"})
+    assert result_cache.get_cached_result("b") is None
+    assert result_cache.get_cached_result("a") == {"v": "a"}
+    assert result_cache.get_cached_result("c") == {"v": "c"}
+
+
+def test_byte_limit_evicts(engine, monkeypatch):
+    monkeypatch.setattr(result_cache, "MAX_BYTES", 1)
+    result_cache.put_cached_result("a", {"v": "a"})
+    assert result_cache.get_cached_result("a") is None
+
+
+def test_analyze_cached_hits_only_for_same_content(engine, stub):
+    first, hit1 = analysis.analyze_cached("data", "hash-1", analyzer=stub)
+    again, hit2 = analysis.analyze_cached("data", "hash-1", analyzer=stub)
+    other, hit3 = analysis.analyze_cached("data", "hash-2", analyzer=stub)
+    assert (hit1, hit2, hit3) == (False, True, False)
+    assert again == first
+    assert stub.calls == ["hash-1", "hash-2"]
+
+
+def test_analyze_cached_version_bump_invalidates(engine, stub, monkeypatch):
+    analysis.analyze_cached("data", "hash-1", analyzer=stub)
+    monkeypatch.setattr(result_cache, "ANALYSIS_VERSION", result_cache.ANALYSIS_VERSION + "-next")
+    _, hit = analysis.analyze_cached("data", "hash-1", analyzer=stub)
+    assert not hit
+    assert len(stub.calls) == 2
+
+
+def test_analyze_cached_skips_nondeterministic_and_errors(engine, stub):
+    analysis.analyze_cached("data", "hash-1", deterministic=False, analyzer=stub)
+    _, hit = analysis.analyze_cached("data", "hash-1", deterministic=False, analyzer=stub)
+    assert not hit
+    analysis.analyze_cached("bad", "hash-bad", analyzer=stub)
+    result, hit = analysis.analyze_cached("bad", "hash-bad", analyzer=stub)
+    assert not hit and "error" in result
+    assert len(stub.calls) == 4
+
+
+def test_loader_not_called_on_hit(engine, stub):
+    loads = []
+    loader = lambda: loads.append(1) or "data"
+    analysis.analyze_cached(loader, "hash-1", analyzer=stub)
+    analysis.analyze_cached(loader, "hash-1", analyzer=stub)
+    assert loads == [1]
+
+
+def test_repeat_upload_is_served_from_cache(client):
+    r = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "booking_date": pd.date_range("2024-01-01", periods=400).strftime("%Y-%m-%d"),
+        "route": r.choice(["DEL-BLR", "BOM-DEL"], 400),
+        "num_passengers": r.integers(50, 300, 400),
+    })
+    body = df.to_csv(index=False).encode()
+
+    def upload(query=""):
+        resp = client.post(f"/api/seat-demand/upload{query}", data={"file": (io.BytesIO(body), "a.csv")},
+                           content_type="multipart/form-data")
+        assert resp.status_code == 200
+        return resp.get_json()
+
+    first, second = upload(), upload()
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["predicted_demand"] == first["predicted_demand"]
+    assert upload("?deterministic=0")["cached"] is False
@@ -0,0 +1,77 @@
+from models import Passenger, get_session
+
+
+def _passenger(email, route="DEL->BLR", tier="GOLD", day="2025-01-05"):
+    return Passenger(name=email.split("@")[0], email=email, route=route, tier=tier, lastBooking=day)
+
+
+def test_insert_counts_every_dimension(engine, assert_rollups_consistent):
+    with get_session() as s:
+        s.add_all([_passenger("a@x.com"), _passenger("b@x.com"), _passenger("c@x.com", route="BOM->DEL", tier="SILVER")])
+        s.commit()
+    r = assert_rollups_consistent()
+    assert r[("route", "DEL->BLR")] == 2
+    assert r[("route", "BOM->DEL")] == 1
+    assert r[("tier", "GOLD")] == 2
+    assert r[("day", "2025-01-05")] == 3
+
+
+def test_update_moves_record_between_routes(engine, assert_rollups_consistent):
+    with get_session() as s:
+        s.add_all([_passenger("a@x.com"), _passenger("b@x.com")])
+        s.commit()
+        # attributes are expired by the commit; the old values must still be seen
+        p = s.query(Passenger).filter_by(email="a@x.com").one()
+        s.expire(p)
+        p.route, p.tier, p.lastBooking = "HYD->MAA", "PLATINUM", "2025-02-01T10:00:00"
+        s.commit()
+    r = assert_rollups_consistent()
+    assert r[("route", "DEL->BLR")] == 1
+    assert r[("route", "HYD->MAA")] == 1
+    assert r[("day", "2025-02-01")] == 1
+
+
+def test_update_of_untracked_fields_leaves_rollups(engine, assert_rollups_consistent):
+    with get_session() as s:
+        p = _passenger("a@x.com")
+        s.add(p)
+        s.commit()
+        before = assert_rollups_consistent()
+        p.name = "Renamed"
+        s.commit()
+    assert assert_rollups_consistent() == before
+
+
+def test_insert_and_update_in_one_flush(engine, assert_rollups_consistent):
+    with get_session() as s:
+        p = _passenger("a@x.com")
+        s.add(p)
+        s.flush()
+        p.route = "BLR->BOM"
+        s.flush()
+        p.route = "BOM->DEL"
+        s.commit()
+    r = assert_rollups_consistent()
+    assert r == {("route", "BOM->DEL"): 1, ("tier", "GOLD"): 1, ("day", "2025-01-05"): 1}
+
+
+def test_delete_drops_rows_that_reach_zero(engine, assert_rollups_consistent):
+    with get_session() as s:
+        s.add_all([_passenger("a@x.com"), _passenger("b@x.com", route="BOM->DEL")])
+        s.commit()
+        s.delete(s.query(Passenger).filter_by(email="b@x.com").one())
+        s.commit()
+    r = assert_rollups_consistent()
+    assert ("route", "BOM->DEL") not in r
+    assert r[("route", "DEL->BLR")] == 1
+
+
+def test_rollback_leaves_rollups_untouched(engine, assert_rollups_consistent):
+    with get_session() as s:
+        s.add(_passenger("a@x.com"))
+        s.commit()
+        before = assert_rollups_consistent()
+        s.add(_passenger("b@x.com"))
+        s.flush()
+        s.rollback()
+    assert assert_rollups_consistent() == before
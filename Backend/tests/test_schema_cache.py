@@ -0,0 +1,81 @@
+import time
+
+import pandas as pd
+import pytest
+
+import analysis
+from cache import TTLCache
+
+
+@pytest.fixture(autouse=True)
+def empty_schema_cache():
+    analysis.SCHEMA_CACHE.invalidate()
+    yield
+    analysis.SCHEMA_CACHE.invalidate()
+
+
+def _frame(n=50, passengers=None):
+    return pd.DataFrame({
+        "booking_date": pd.date_range("2024-01-01", periods=n).strftime("%d/%m/%Y"),
+        "route": ["DEL-BLR", "BOM-DEL"] * (n // 2),
+        "num_passengers": passengers if passengers is not None else range(n),
+    })
+
+
+def _forbid_detection(monkeypatch):
+    def boom(*a, **k):
+        raise AssertionError("schema detection ran on a cached layout")
+    monkeypatch.setattr(analysis, "_detect_date_col", boom)
+    monkeypatch.setattr(analysis, "_detect_target", boom)
+
+
+def test_same_layout_skips_detection(monkeypatch):
+    date_col, target = analysis._detect_schema(_frame())
+    assert (date_col, target) == ("booking_date", "num_passengers")
+
+    _forbid_detection(monkeypatch)
+    df = _frame(80)
+    assert analysis._detect_schema(df) == (date_col, target)
+    # the cached date format is still applied to the new frame's full column
+    assert pd.api.types.is_datetime64_any_dtype(df["booking_date"])
+    assert df["booking_date"].iloc[12] == pd.Timestamp("2024-01-13", tz="UTC")
+
+
+def test_changed_columns_or_dtypes_miss(monkeypatch):
+    analysis._detect_schema(_frame())
+    renamed = _frame().rename(columns={"route": "sector"})
+    retyped = _frame(passengers=[str(i) for i in range(50)])
+    for df in (renamed, retyped):
+        assert analysis._schema_signature(df) != analysis._schema_signature(_frame())
+    misses = analysis.SCHEMA_CACHE.misses
+    analysis._detect_schema(renamed)
+    assert analysis.SCHEMA_CACHE.misses == misses + 1
+
+
+def test_cached_casts_are_reapplied(monkeypatch):
+    text = pd.DataFrame({"when": ["2024-01-01", "2024-01-02"] * 10, "value": [str(i) for i in range(20)]})
+    date_col, target = analysis._detect_schema(text.copy())
+    assert (date_col, target) == ("when", "value")
+
+    _forbid_detection(monkeypatch)
+    again = text.copy()
+    assert analysis._detect_schema(again) == (date_col, target)
+    assert pd.api.types.is_numeric_dtype(again["value"])
+    assert pd.api.types.is_datetime64_any_dtype(again["when"])
+
+
+def test_ttl_expiry_and_invalidate():
+    c = TTLCache(ttl=0.05, maxsize=2, name="test")
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.invalidate("a")
+    assert c.get("a") is None
+    time.sleep(0.06)
+    assert c.get("b") is None
+    c.set("x", 1, ttl=60)
+    c.set("y", 2, ttl=1)
+    c.set("z", 3, ttl=60)  # full: drops the entry closest to expiry
+    assert (c.get("x"), c.get("y"), c.get("z")) == (1, None, 3)
+    c.invalidate()
+    assert c.stats()["size"] == 0
@@ -0,0 +1,180 @@
+import os, threading, time, warnings
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+MAX_ROUNDS = int(os.environ.get("TRAIN_MAX_ROUNDS", 200))
+EARLY_STOPPING_ROUNDS = int(os.environ.get("TRAIN_EARLY_STOPPING_ROUNDS", 20))  # 0 disables
+TIME_BUDGET_SECONDS = float(os.environ.get("TRAIN_TIME_BUDGET_SECONDS", 120))   # 0 disables
+ROW_BUDGET = int(os.environ.get("TRAIN_ROW_BUDGET", 1_000_000))                 # 0 disables
+# early stopping watches a slice of the training rows, never the reported test split
+VALIDATION_SHARE = float(os.environ.get("TRAIN_VALIDATION_SHARE", 0.1))
+VALIDATION_MAX_ROWS = int(os.environ.get("TRAIN_VALIDATION_MAX_ROWS", 50_000))
+VALIDATION_MIN_ROWS = 50  # below this, train on everything without early stopping
+# refit on half the sample to estimate what subsampling cost (extra ~50% fit time)
+MEASURE_SUBSAMPLE_COST = os.environ.get("TRAIN_SUBSAMPLE_COST", "1").lower() not in ("0", "false", "no")
+
+TOTAL_THREADS = int(os.environ.get("TRAIN_THREADS", os.cpu_count() or 1))
+# per-fit cap, so two trainings can run side by side by default
+THREADS_PER_FIT = int(os.environ.get("TRAIN_THREADS_PER_FIT", max(1, TOTAL_THREADS // 2)))
+
+# eval_set still works everywhere; newer LightGBM only prefers eval_X/eval_y
+warnings.filterwarnings("ignore", message="The argument 'eval_set' is deprecated")
+
+
+# ============================================================
+# 🧵 Thread budget shared by concurrent fits in this process
+# ============================================================
+class ThreadBudget:
+    """
+    Hands out LightGBM thread counts so concurrent fits never use more
+    than `total` threads together; a fit waits while none are free.
+    """
+
+    def __init__(self, total=TOTAL_THREADS, per_fit=THREADS_PER_FIT):
+        self.total, self.per_fit = max(1, total), max(1, per_fit)
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def set_total(self, total, per_fit=None):
+        with self._cond:
+            self.total = max(1, total)
+            self.per_fit = max(1, min(per_fit or self.per_fit, self.total))
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self):
+        with self._cond:
+            while self._used >= self.total:
+                self._cond.wait()
+            n = min(self.per_fit, self.total - self._used)
+            self._used += n
+        try:
+            yield n
+        finally:
+            with self._cond:
+                self._used -= n
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"total": self.total, "per_fit": self.per_fit, "in_use": self._used}
+
+
+THREADS = ThreadBudget()
+
+
+# ============================================================
+# ⏱️ Budgeted fit (early stopping + wall clock)
+# ============================================================
+def _time_budget(seconds):
+    deadline = time.monotonic() + seconds
+
+    def _callback(env):
+        if time.monotonic() > deadline:
+            _callback.fired = True
+            raise lgb.callback.EarlyStopException(env.iteration, env.evaluation_result_list or [])
+    _callback.fired = False
+    _callback.order = 40  # after lgb.early_stopping (order 30)
+    return _callback
+
+
+def fit(make_estimator, X_fit, y_fit, X_val=None, y_val=None, init_model=None,
+        n_estimators=MAX_ROUNDS, early_stopping=True, time_budget=TIME_BUDGET_SECONDS):
+    """
+    Fits make_estimator(n_estimators, n_jobs) under the process thread
+    budget, stopping early when the held-out l2 stops improving or the
+    wall-clock budget runs out. Returns (booster, report).
+    """
+    callbacks, fit_kwargs = [], {}
+    use_val = X_val is not None and len(X_val) > 0
+    if use_val:
+        fit_kwargs.update(eval_set=[(X_val, y_val)], eval_metric="l2")
+        if early_stopping and EARLY_STOPPING_ROUNDS:
+            callbacks.append(lgb.early_stopping(EARLY_STOPPING_ROUNDS, first_metric_only=True, verbose=False))
+    budget = _time_budget(time_budget) if time_budget else None
+    if budget:
+        callbacks.append(budget)
+
+    t0 = time.perf_counter()
+    with THREADS.lease() as n_jobs:
+        est = make_estimator(n_estimators, n_jobs)
+        est.fit(X_fit, y_fit, init_model=init_model, callbacks=callbacks, **fit_kwargs)
+    # LightGBM already trims an early-stopped booster to its best iteration
+    booster = est.booster_
+    kept = booster.current_iteration() - (init_model.current_iteration() if init_model is not None else 0)
+    time_hit = bool(budget and budget.fired)
+    return booster, {
+        "n_jobs": n_jobs,
+        "rounds_requested": n_estimators,
+        "rounds_kept": kept,
+        "early_stopped": bool(use_val and kept < n_estimators and not time_hit),
+        "time_budget_hit": time_hit,
+        "fit_seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def validation_split(n, seed):
+    """
+    (fit_positions, val_positions) carving an early-stopping slice of
+    VALIDATION_SHARE (at most VALIDATION_MAX_ROWS) out of n training rows,
+    or None when that slice would be too small to be worth it.
+    """
+    n_val = min(int(n * VALIDATION_SHARE), VALIDATION_MAX_ROWS)
+    if not EARLY_STOPPING_ROUNDS or n_val < VALIDATION_MIN_ROWS:
+        return None
+    order = np.random.default_rng(seed).permutation(n)
+    return np.sort(order[n_val:]), np.sort(order[:n_val])
+
+
+# ============================================================
+# 🎯 Stratified row budget
+# ============================================================
+def stratified_positions(strata, budget, seed):
+    """
+    Positions of at most ~budget rows drawn proportionally from every
+    stratum (distinct row of `strata`, e.g. route x month), keeping at
+    least one row per stratum so rare routes/months survive. Returns
+    None when the frame already fits the budget.
+    """
+    n = len(strata)
+    if not budget or n <= budget:
+        return None
+    if strata.shape[1]:
+        groups = strata.groupby(list(strata.columns), sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    else:
+        groups = np.zeros(n, dtype=np.int64)
+    counts = np.bincount(groups)
+    quota = np.maximum(1, np.floor(counts * (budget / n))).astype(np.int64)
+    order = np.random.default_rng(seed).permutation(n)
+    g = groups[order]
+    rank = pd.Series(g).groupby(g).cumcount().to_numpy()  # rank within stratum, in shuffled order
+    return np.sort(order[rank < quota[g]])
+
+
+def _rmse(booster, X, y):
+    return float(np.sqrt(np.mean((booster.predict(X) - np.asarray(y)) ** 2)))
+
+
+def subsample_cost(booster, refit_half, X_val, y_val, rows_used, rows_total):
+    """
+    Estimates the held-out RMSE a full-data fit would reach from a
+    learning curve rmse(n) = c + k / sqrt(n) through the sample fit and a
+    half-sample refit; the difference is the accuracy cost of sampling.
+    """
+    rmse_used = _rmse(booster, X_val, y_val)
+    report = {"heldout_rmse": round(rmse_used, 4)}
+    if refit_half is None or X_val is None or not len(X_val):
+        return report
+    half_booster, rows_half = refit_half()
+    rmse_half = _rmse(half_booster, X_val, y_val)
+    k = (rmse_half - rmse_used) / (rows_half ** -0.5 - rows_used ** -0.5)
+    full = rmse_used - k * (rows_used ** -0.5 - rows_total ** -0.5) if k > 0 else rmse_used
+    report.update(
+        heldout_rmse_half_sample=round(rmse_half, 4),
+        estimated_full_data_rmse=round(full, 4),
+        estimated_rmse_cost=round(rmse_used - full, 4),
+        estimated_rmse_cost_pct=round(100 * (rmse_used - full) / full, 2) if full else 0.0,
+    )
+    return report
@@ -31,10 +31,11 @@ const FlightOpsPage = () => {
   const [lastUpdated, setLastUpdated] = useState(Date.now());
   const timer = useRef(null);
 
+  // Fallback for browsers without EventSource: conditional polling (304 when unchanged)
   const fetchData = async () => {
     try {
       const t0 = performance.now();
-      const res = await fetch(`${API_BASE}/api/flightops/status`);
+      const res = await fetch(`${API_BASE}/api/flightops/status`, { cache: "no-cache" });
       const json = await res.json();
       setFlights(json.flights || []);
       setDisruptions(json.disruptions || []);
@@ -48,12 +49,47 @@ const FlightOpsPage = () => {
     }
   };
 
+  // Apply one delta event: replace changed items by key, drop removed ones
+  const applyDelta = (list, delta, key) => {
+    const byKey = new Map(list.map((x) => [x[key], x]));
+    (delta.removed || []).forEach((k) => byKey.delete(k));
+    (delta.changed || []).forEach((x) => byKey.set(x[key], x));
+    return Array.from(byKey.values());
+  };
+
+  const onEvent = (payload) => {
+    setLastUpdated(Date.now());
+    setLoading(false);
+    if (payload.generatedAt) {
+      const lag = Date.now() - Date.parse(payload.generatedAt + "Z");
+      setLatency((prev) => [...prev.slice(-24), Math.max(0, Math.round(lag))]);
+    }
+  };
+
   useEffect(() => {
-    fetchData();
-    timer.current = window.setInterval(fetchData, 10000);
-    return () => {
-      if (timer.current) window.clearInterval(timer.current);
-    };
+    if (!window.EventSource) {
+      fetchData();
+      timer.current = window.setInterval(fetchData, 10000);
+      return () => {
+        if (timer.current) window.clearInterval(timer.current);
+      };
+    }
+    // Push stream: one snapshot, then deltas; the browser resumes via Last-Event-ID
+    const es = new EventSource(`${API_BASE}/api/flightops/stream`);
+    es.addEventListener("snapshot", (e) => {
+      const snap = JSON.parse(e.data);
+      setFlights(snap.flights || []);
+      setDisruptions(snap.disruptions || []);
+      onEvent(snap);
+    });
+    es.addEventListener("delta", (e) => {
+      const delta = JSON.parse(e.data);
+      setFlights((prev) => applyDelta(prev, delta.flights, "flightNo"));
+      setDisruptions((prev) => applyDelta(prev, delta.disruptions, "id"));
+      onEvent(delta);
+    });
+    es.onerror = (err) => console.error("FlightOps stream error:", err);
+    return () => es.close();
   }, []);
 
   const maxLatency = useMemo(
@@ -90,7 +126,7 @@ const FlightOpsPage = () => {
           <div>
             <h2 className="text-lg font-semibold">Real-time Ops</h2>
             <p className="text-sm opacity-80">
-              Live flights, delays, and disruptions (auto-refresh every 10s)
+              Live flights, delays, and disruptions (streamed as they change)
             </p>
           </div>
         </div>
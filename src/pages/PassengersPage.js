@@ -29,6 +29,10 @@ const PassengersPage = () => {
   const [route, setRoute] = useState("ALL");
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  // keyset pagination: the API returns one page + next_cursor
+  const [nextCursor, setNextCursor] = useState(null);
+  const [total, setTotal] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // modal
   const [showModal, setShowModal] = useState(false);
@@ -45,21 +49,24 @@ const PassengersPage = () => {
   const [analytics, setAnalytics] = useState({ routes: [], tiers: [], trend: [] });
   const [loadingAnalytics, setLoadingAnalytics] = useState(false);
 
-  // Load passengers
+  const fetchPage = async (cursor) => {
+    const params = { q, route: route === "ALL" ? "" : route };
+    if (cursor) params.cursor = cursor;
+    else params.include_total = "1";
+    const res = await fetch(`${API_BASE}/api/passengers?` + new URLSearchParams(params));
+    if (!res.ok) throw new Error("Failed to fetch passengers");
+    return res.json();
+  };
+
+  // Load passengers (first page)
   const load = async () => {
     try {
       setLoading(true);
       setError("");
-      const res = await fetch(
-        `${API_BASE}/api/passengers?` +
-          new URLSearchParams({
-            q,
-            route: route === "ALL" ? "" : route,
-          })
-      );
-      if (!res.ok) throw new Error("Failed to fetch passengers");
-      const json = await res.json();
+      const json = await fetchPage(null);
       setRows(json.items || []);
+      setNextCursor(json.next_cursor || null);
+      setTotal(json.total ?? null);
     } catch (err) {
       console.error("❌ Passenger load error:", err);
       setError("Could not load passengers.");
@@ -68,6 +75,22 @@ const PassengersPage = () => {
     }
   };
 
+  // Append the next page
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const json = await fetchPage(nextCursor);
+      setRows((prev) => [...prev, ...(json.items || [])]);
+      setNextCursor(json.next_cursor || null);
+    } catch (err) {
+      console.error("❌ Passenger load error:", err);
+      setError("Could not load more passengers.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadAnalytics = async () => {
     try {
       setLoadingAnalytics(true);
@@ -91,13 +114,15 @@ const PassengersPage = () => {
 
   useEffect(() => {
     loadAnalytics();
-  }, [rows.length]); // refresh analytics when data changes count
+  }, []); // saves/deletes refresh it explicitly
 
-  // routes filter options from data
+  // routes filter options: every route from the analytics rollups (the loaded
+  // rows are only the first page(s), so they can't be the source)
   const routeOptions = useMemo(() => {
-    const s = new Set(rows.map((r) => r.route));
-    return ["ALL", ...Array.from(s)];
-  }, [rows]);
+    const s = new Set(analytics.routes.map((r) => r.route));
+    if (route !== "ALL") s.add(route);
+    return ["ALL", ...Array.from(s).sort()];
+  }, [analytics.routes, route]);
 
   // Add or Update passenger
   const handleSavePassenger = async (e) => {
@@ -259,6 +284,24 @@ const PassengersPage = () => {
             </table>
           )}
         </div>
+
+        {!loading && !error && rows.length > 0 && (
+          <div className="flex items-center justify-between mt-3 text-sm text-white/60">
+            <span>
+              Showing {rows.length.toLocaleString()}
+              {total != null ? ` of ${total.toLocaleString()}` : ""} passengers
+            </span>
+            {nextCursor && (
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="px-3 py-1.5 rounded-xl bg-blue-600/20 hover:bg-blue-600/30 transition disabled:opacity-50"
+              >
+                {loadingMore ? "Loading…" : "Load more"}
+              </button>
+            )}
+          </div>
+        )}
       </div>
 
       {/* Analytics */}